@@ -2,44 +2,160 @@
 import re
 import sys
 import os
+import itertools
+import heapq
+import fnmatch
+import bisect
 
 
 def usage():
-    print("%s <file.tex/path> [-x <excluded-switch1>] [-i <included-switch1>] [-i/x <switch n, evaluated in order of specification>] [--error]" % sys.argv[0])
+    print("%s <file.tex/path> [-x <excluded-switch1>] [-i <included-switch1>] [-i/x <switch n, evaluated in order of specification>] [-j <jobs>] [--fix] [--stats] [--error]" % sys.argv[0])
     sys.exit(1)
 
-if len(sys.argv) < 2:
-    usage()
-    
 
 tex_files = []
-
-if(not sys.argv[1].endswith(".tex")):
-    for path, subdirs, files in os.walk(sys.argv[1]):
-        for f in files:
-            if f.endswith(".tex"):
-                tex_files.append(os.path.join(path,f))
-else:
-    tex_files = [sys.argv[1]]
+bib_files = []
+
+
+def find_files(path):
+    global tex_files, bib_files
+    if(not path.endswith(".tex")):
+        for p, subdirs, files in os.walk(path):
+            for f in files:
+                if f.endswith(".tex"):
+                    tex_files.append(os.path.join(p,f))
+                if f.endswith(".bib"):
+                    bib_files.append(os.path.join(p,f))
+        # the order of os.walk is arbitrary, but the messages of the bibliography rules depend on it
+        bib_files.sort()
+    else:
+        tex_files = [path]
+        bib_dir = os.path.dirname(path) or "."
+        if os.path.isdir(bib_dir):
+            bib_files = [os.path.join(bib_dir, f) for f in sorted(os.listdir(bib_dir)) if f.endswith(".bib")]
 
 tex = None   
 tex_lines = None
 tex_lines_clean = None
 in_env = None
 envs = None
+math_mask = None
+line_offsets = None
+equation_lines = None
+code_lines = None
+suppressions = None
+suppressed_any = None
+suppression_errors = None
+views = None
+sentence_starts = None
+paragraphs = None
+
+MASK_MATH = 1
+MASK_CODE = 2
+
+math_envs = ["equation", "align", "alignat", "flalign", "gather", "multline", "eqnarray", "math", "displaymath"]
+code_envs = ["lstlisting", "verbatim", "Verbatim", "minted", "comment"]
+equation_envs = math_envs + ["theorem", "proof", "proposition"]
+
+# everything that can open a math or code region, plus escapes and comments that must be skipped
+math_open = "\\\\\\\\|\\\\[$%%]|%%[^\\n]*|\\\\verb\\*?[^\\w\\s*]|\\$\\$|\\$|\\\\\\(|\\\\\\[|\\\\begin\\{(%s)\\*?\\}" % "|".join(math_envs + code_envs)
     
-def next_file(file):
-    global tex, tex_lines, tex_lines_clean, in_env, envs
+# encodings of the inputenc package that Python names differently
+inputenc_encodings = {
+    "utf8": "utf-8",
+    "utf8x": "utf-8",
+    "latin1": "latin-1",
+    "latin2": "iso8859-2",
+    "latin3": "iso8859-3",
+    "latin4": "iso8859-4",
+    "latin5": "iso8859-9",
+    "latin9": "iso8859-15",
+    "latin10": "iso8859-16",
+    "macce": "mac-latin2",
+    "ansinew": "cp1252",
+    "applemac": "mac-roman"
+}
+
+boms = [
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xff\xfe\x00\x00", "utf-32"),
+    (b"\x00\x00\xfe\xff", "utf-32"),
+    (b"\xff\xfe", "utf-16"),
+    (b"\xfe\xff", "utf-16")
+]
+
+tex_encoding = None
+tex_newline = None
+
+
+def detect_encoding(data):
+    for bom, encoding in boms:
+        if data[:len(bom)] == bom:
+            return encoding
+    # a magic comment in the first lines, then the inputenc package
+    m = re.search(b"^%\\s*!TEX\\s+encoding\\s*=\\s*([\\w.:-]+)", data[:1024], re.M | re.I)
+    if m:
+        return known_encoding(m.group(1).decode("ascii"))
+    # the package must not be commented out
+    m = re.search(b"^(?:\\\\.|[^%\\\\\\n])*\\\\usepackage\\[([\\w,\\s]+)\\]\\{inputenc\\}", data, re.M)
+    if m:
+        encoding = m.group(1).decode("ascii").split(",")[-1].strip()
+        return known_encoding(inputenc_encodings.get(encoding, encoding))
+    return "utf-8"
+
+
+def known_encoding(encoding):
+    # encodings that Python does not know are read as UTF-8, like files without any encoding
+    import codecs
     try:
-        tex = open(file).read()
-    except:
-        print("Could not open '%s'" % sys.argv[1])
-        sys.exit(1)
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return "utf-8"
+
+
+def read_file(file):
+    # the file is decoded directly from the mapped memory, without reading it into a separate buffer first
+    import mmap
+    with open(file, "rb") as f:
+        # empty files cannot be mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return "", "utf-8", "\n"
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as data:
+            encoding = detect_encoding(data)
+            try:
+                content = str(data, encoding)
+            except UnicodeDecodeError as e:
+                raise ValueError("invalid %s in line %d (%s)" % (encoding, data[:e.start].count(b"\n") + 1, e.reason))
+            newline = "\r\n" if data.find(b"\r\n") != -1 else "\n"
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content, encoding, newline
+
 
+def next_file(file):
+    global tex_encoding, tex_newline
+    try:
+        content, tex_encoding, tex_newline = read_file(file)
+    except OSError as e:
+        print("Could not open '%s': %s" % (file, e.strerror), file = sys.stderr)
+        return False
+    except (LookupError, ValueError) as e:
+        print("Could not decode '%s': %s" % (file, e), file = sys.stderr)
+        return False
+    set_text(content)
+    return True
+
+
+def set_text(content):
+    global tex, tex_lines, tex_lines_clean, in_env, envs
+    tex = content
     tex_lines = tex.split("\n")
-    tex_lines_clean = tex.split("\n")
+    # the comment-free lines start as the same strings, preprocess() replaces the ones with comments
+    tex_lines_clean = list(tex_lines)
     in_env = {}
     envs = {}
+    reset_views()
+    reset_sentences()
 
 
 def preprocess():
@@ -69,6 +185,141 @@ def preprocess():
                     tex_lines_clean[i] = tex_lines[i]
             else:
                 tex_lines_clean[i] = tex_lines[i]
+    build_math_mask()
+    build_suppressions()
+
+
+def math_skip(tok):
+    # comments and escaped characters
+    return tok[0] == "%" or (len(tok) == 2 and tok[0] == "\\" and tok[1] in "\\$%")
+
+
+def math_close(t):
+    tok = t.group()
+    if tok.startswith("\\verb"):
+        return re.compile(re.escape(tok[-1])), MASK_CODE
+    if tok.startswith("\\begin"):
+        close = "\\end" + tok[len("\\begin"):]
+        return re.compile(re.escape(close)), MASK_CODE if t.group(1) in code_envs else MASK_MATH
+    close = {"$": "\\$", "$$": "\\$\\$", "\\(": "\\\\\\)", "\\[": "\\\\\\]"}[tok]
+    # escaped dollars and comments cannot close math
+    return re.compile("\\\\[\\\\$%%]|%%[^\\n]*|%s" % close), MASK_MATH
+
+
+def build_math_mask():
+    global math_mask, line_offsets, equation_lines, code_lines
+    math_mask = bytearray(len(tex) + 1)
+    line_offsets = [0]
+    for l in tex_lines[:-1]:
+        line_offsets.append(line_offsets[-1] + len(l) + 1)
+
+    opener = re.compile(math_open)
+    pos = 0
+    while True:
+        t = opener.search(tex, pos)
+        if not t: break
+        pos = t.end()
+        if math_skip(t.group()): continue
+        close, kind = math_close(t)
+        end = pos
+        while True:
+            c = close.search(tex, end)
+            if not c or kind == MASK_CODE or not math_skip(c.group()):
+                break
+            end = c.end()
+        if not c: continue # unterminated, do not mask the rest of the document
+        math_mask[t.start():c.end()] = bytes([kind]) * (c.end() - t.start())
+        pos = c.end()
+
+    # lines inside display math or theorem-like environments, and lines that only consist of code
+    equation_lines = []
+    code_lines = []
+    for i, l in enumerate(tex_lines):
+        eq = any(e in in_env and in_env[e][i] for e in equation_envs)
+        code = False
+        if l.strip():
+            start = line_offsets[i] + len(l) - len(l.lstrip())
+            end = line_offsets[i] + len(l.rstrip())
+            if not eq:
+                eq = math_mask.find(0, start, end) == -1 and math_mask[start] == MASK_MATH
+            code = math_mask.find(0, start, end) == -1 and math_mask.find(MASK_MATH, start, end) == -1
+        equation_lines.append(eq)
+        code_lines.append(code)
+
+
+def merge_intervals(intervals):
+    merged = []
+    for s, e in sorted(intervals):
+        if merged and s <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return ([x[0] for x in merged], [x[1] for x in merged])
+
+
+def build_suppressions():
+    # line intervals per rule (None for all rules) in which no warnings are reported
+    global suppressions, suppressed_any, suppression_errors
+    intervals = {None: []}
+    suppression_errors = []
+    disabled = {}
+    n = len(tex_lines)
+
+    def suppress(rules, start, end):
+        for r in rules:
+            intervals.setdefault(r, []).append((start, end))
+
+    for i, l in enumerate(tex_lines):
+        if l.strip().startswith("%"):
+            intervals[None].append((i, i + 1))
+        c = re.search("(?<!\\\\)%\\s*paperlint-(disable-next-line|disable-file|disable|enable)\\b([^%]*)", l)
+        if not c: continue
+        # a reason can follow after "--"
+        names = [x for x in re.split("[\\s,]+", c.group(2).split("--")[0]) if x]
+        if names:
+            mask = 0
+            for x in names:
+                if x not in switch_masks:
+                    suppression_errors.append((i, x))
+                mask |= switch_masks.get(x, 0)
+            rules = [r for r in range(len(all_checks)) if mask >> r & 1]
+        else:
+            rules = [None]
+        if c.group(1) == "disable-next-line":
+            suppress(rules, i + 1, i + 2)
+        elif c.group(1) == "disable-file":
+            suppress(rules, 0, n)
+        elif c.group(1) == "disable":
+            for r in rules:
+                disabled.setdefault(r, i)
+        else:
+            for r in list(disabled):
+                if r in rules or rules == [None]:
+                    suppress([r], disabled.pop(r), i)
+    for r in disabled:
+        suppress([r], disabled[r], n)
+
+    suppressions = {r: merge_intervals(intervals[r]) for r in intervals}
+    suppressed_any = merge_intervals([x for r in intervals for x in intervals[r]])
+
+
+def in_intervals(intervals, line):
+    if intervals is None: return False
+    k = bisect.bisect_right(intervals[0], line) - 1
+    return k >= 0 and line < intervals[1][k]
+
+
+def is_suppressed(rule, line):
+    if not in_intervals(suppressed_any, line): return False
+    return in_intervals(suppressions[None], line) or in_intervals(suppressions.get(rule), line)
+
+
+def in_math(line, col):
+    return math_mask[line_offsets[line] + col] == MASK_MATH
+
+
+def in_verbatim(line, col):
+    return math_mask[line_offsets[line] + col] == MASK_CODE
 
 
 def in_any_env(line):
@@ -86,45 +337,117 @@ def in_any_float(line):
     return False
 
 def in_code(line):
-    if "lstlisting" in in_env:
-        return in_env["lstlisting"][line]
-    return False
+    # verbatim, listings, minted, and comment environments
+    return code_lines[line]
 
-def in_equation(line):
-    if "equation" in in_env and in_env["equation"][line]:
-        return True
-    if "align" in in_env and in_env["align"][line]:
-        return True
-    if "align*" in in_env and in_env["align*"][line]:
-        return True
-    if "eqnarray" in in_env and in_env["eqnarray"][line]:
-        return True
-    if "theorem" in in_env and in_env["theorem"][line]:
-        return True
-    if "proof" in in_env and in_env["proof"][line]:
-        return True
-    if "proposition" in in_env and in_env["proposition"][line]:
-        return True
-    
-    return False
 
-def check_space_before_cite():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        b = re.search("[^ ~]\\\\cite", l)
-        if b:
-            if not "\\etal\\cite" in l:
-                warns.append((i, "No space before \\cite", b.span(0)))
-    return warns
+def without_code(line, l):
+    # the line with inline code such as \verb replaced by spaces, columns stay the same
+    start = line_offsets[line]
+    if math_mask.find(MASK_CODE, start, start + len(l)) == -1: return l
+    return "".join(" " if math_mask[start + k] == MASK_CODE else c for k, c in enumerate(l))
+
+def in_equation(line):
+    return equation_lines[line]
+
+
+# derived versions of a line that several rules need, computed once per line when they are first used
+line_views = {
+    "lower": str.lower,
+    "upper": str.upper,
+    "strip": str.strip,
+    "rstrip": str.rstrip
+}
+
+
+def reset_views():
+    global views
+    views = {}
+
+
+def line_view(line, view, clean = True):
+    # view of the comment-free line, or of the original line if clean is False
+    key = (view, clean)
+    if key not in views:
+        views[key] = [None] * len(tex_lines)
+    if views[key][line] is None:
+        views[key][line] = line_views[view]((tex_lines_clean if clean else tex_lines)[line])
+    return views[key][line]
+
+
+def view_column(line, view, col, clean = True):
+    # column in the line for a column in its view
+    l = (tex_lines_clean if clean else tex_lines)[line]
+    if view == "strip":
+        return col + len(l) - len(l.lstrip())
+    if view in ["lower", "upper"] and len(line_view(line, view, clean)) != len(l):
+        # some characters change their length when the case is changed, e.g., "ß" becomes "SS"
+        key = (view + "-columns", clean)
+        if key not in views:
+            views[key] = {}
+        if line not in views[key]:
+            views[key][line] = [k for k, c in enumerate(l) for x in line_views[view](c)] + [len(l)]
+        return views[key][line][col]
+    return col
+
+
+def view_span(line, view, span, clean = True):
+    return (view_column(line, view, span[0], clean), view_column(line, view, span[1], clean))
+
+
+# abbreviations that end with a period but do not end a sentence
+abbreviations = ["e.g.", "i.e.", "vs.", "cf.", "et al.", "etc.", "resp.", "approx.", "incl.", "Fig.", "Figs.", "Sec.", "Eq.", "Tab.", "Alg.", "No.", "Dr.", "Prof."]
+abbreviation = re.compile("(?<![\\w.])(?:%s)$" % "|".join(re.escape(a) for a in abbreviations))
+abbreviation_length = max(len(a) for a in abbreviations) + 1
+sentence_boundary = re.compile("[\\.!?]\\s+(\\w+)")
+
+
+def reset_sentences():
+    global sentence_starts, paragraphs
+    # the sentence model is only built for the lines (and paragraphs) that are queried
+    sentence_starts = {}
+    paragraphs = None
+
+
+def line_sentences(line):
+    # spans from the end of a sentence to the first word of the next sentence within a line,
+    # ignoring abbreviations and punctuation in math; LaTeX spacing such as "e.g.\\ " or "Fig.~" is no boundary
+    if line not in sentence_starts:
+        l = line_view(line, "rstrip")
+        starts = []
+        for m in sentence_boundary.finditer(l):
+            if abbreviation.search(l[max(0, m.start() + 1 - abbreviation_length):m.start() + 1]): continue
+            if in_math(line, m.start()): continue
+            starts.append(m)
+        sentence_starts[line] = starts
+    return sentence_starts[line]
+
+
+def line_ends_sentence(line):
+    return line_view(line, "rstrip")[-1:] in [".", "!", "?", ":", ";"]
+
+
+def line_paragraph(line):
+    # paragraphs are runs of non-empty lines, as (first line, last line + 1)
+    global paragraphs
+    if paragraphs is None:
+        paragraphs = [None] * len(tex_lines)
+        start = None
+        for i, l in enumerate(tex_lines + [""]):
+            if len(l.strip()) > 0:
+                if start is None: start = i
+            elif start is not None:
+                for k in range(start, i):
+                    paragraphs[k] = (start, i)
+                start = None
+    return paragraphs[line]
 
 def check_float_alignment(env):
-    warns = []
     for i, l in enumerate(tex_lines):
         b = re.search("\\\\begin\{%s\}" % env, l)
         if b:
             if not re.search("%s}\[[^\]]*[htbH][^\]]*\]" % env, l):
-                warns.append((i, "%s without alignment: %s" % (env, l.strip()), b.span()))
-    return warns
+                yield (i, "%s without alignment: %s" % (env, l.strip()), b.span())
 
 def check_figure_alignment():
     return check_float_alignment("figure")
@@ -136,8 +459,7 @@ def check_listing_alignment():
     return check_float_alignment("listing")
 
 def check_float_has_label(env):
-    warns = []
-    if env not in envs: return warns
+    if env not in envs: return
     for r in envs[env]:
         label = False
         for i in range(*r):
@@ -145,13 +467,11 @@ def check_float_has_label(env):
             if b:
                 label = True
         if not label:
-            warns.append((r[0], "%s without a label" % env))
-    return warns
+            yield (r[0], "%s without a label" % env)
 
 
 def check_float_has_caption(env):
-    warns = []
-    if env not in envs: return warns
+    if env not in envs: return
     for r in envs[env]:
         label = False
         for i in range(*r):
@@ -159,12 +479,10 @@ def check_float_has_caption(env):
             if b:
                 label = True
         if not label:
-            warns.append((r[0], "%s without a caption" % env))
-    return warns
+            yield (r[0], "%s without a caption" % env)
 
 def check_float_caption_label_order(env):
-    warns = []
-    if env not in envs: return warns
+    if env not in envs: return
     for r in envs[env]:
         label = -1
         caption = -1
@@ -176,13 +494,11 @@ def check_float_caption_label_order(env):
             if b:
                 label = i
         if label > -1 and caption > -1 and label < caption:
-            warns.append((r[0], "label before caption in %s, swap for correct references" % env))
-    return warns
+            yield (r[0], "label before caption in %s, swap for correct references" % env)
 
 
 def check_no_resizebox_for_tables():
-    warns = []
-    if "table" not in envs: return warns
+    if "table" not in envs: return
     for r in envs["table"]:
         rb = False
         b = None
@@ -192,18 +508,8 @@ def check_no_resizebox_for_tables():
                 rb = True
                 break
         if rb:
-            warns.append((r[0], "table with resizebox -> use adjustbox instead"))
-    return warns
-
+            yield (r[0], "table with resizebox -> use adjustbox instead")
 
-def check_weird_units():
-    warns = []
-    block = ["\\textwidth", "\\linewidth"]
-    for i, l in enumerate(tex_lines):
-        for b in block:
-            if b in l:
-                warns.append((i, "use \\hsize instead of %s" % b, (l.index(b), l.index(b) + len(b))))
-    return warns
 
 def check_figure_has_label():
     return check_float_has_label("figure")
@@ -232,48 +538,11 @@ def check_table_caption_label_order():
 def check_listing_caption_label_order():
     return check_float_caption_label_order("listing")
 
-def check_todos():
-    warns = []
-    for i, l in enumerate(tex_lines_clean):
-        if "TODO" in l:
-            warns.append((i, "TODO found", (l.index("TODO"), l.index("TODO") + 4)))
-    return warns
-
-
-def check_notes():
-    warns = []
-    for i, l in enumerate(tex_lines_clean):
-        if "\\note" in l:
-            warns.append((i, "\\note found", (l.index("\\note"), l.index("\\note") + 5)))
-        if "\\todo" in l:
-            warns.append((i, "\\todo found", (l.index("\\todo"), l.index("\\todo") + 5)))
-    return warns
-
-
-def check_math_numbers():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        n = re.search("\\$\\d+\\$", tex_lines[i]) 
-        if n and not in_any_float(i):
-            warns.append((i, "Number in math mode, consider using siunit instead", n.span()))
-    return warns
-
-
-def check_large_numbers_without_si():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        n = re.search("[\\s\(]\\d{5,}[\\s\),\.]", tex_lines[i]) 
-        if n and not in_any_float(i):
-            warns.append((i, "Large number without formating, consider using siunit", n.span()))
-    return warns
-
 def check_env_not_in_float(env, float_env):
-    warns = []
     if env in envs:
         for e in envs[env]:
             if (float_env not in in_env) or (not in_env[float_env][e[0]]):
-                warns.append((e[0], "%s not within %s environment" % (env, float_env)))
-    return warns
+                yield (e[0], "%s not within %s environment" % (env, float_env))
     
 
 def check_listing_in_correct_float():
@@ -286,38 +555,7 @@ def check_tikz_in_correct_float():
     return check_env_not_in_float("tikzpicture", "figure")
 
 
-def check_comment_has_space():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        ls = l.strip()
-        if "%" in ls:
-            if ls[0] != "%":
-                c = re.search("[^\\s\\\\\\}\\{%]+%", l)
-                if c and not in_code(i):
-                    warns.append((i, "Comment without a whitespace before", c.span()))
-    return warns
-
-
-def check_percent_without_siunix():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        n = re.search("\\d+\\s*\\\\%", l)
-        if n:
-            warns.append((i, "Number with percent without siunit", n.span(0)))
-    return warns
-
-
-def check_short_form():
-    warns = []
-    for i, l in enumerate(tex_lines_clean):
-        n = re.search("[^`%]\\w+'[a-rt-z]", l)
-        if n:
-            warns.append((i, "Contracted form used", n.span()))
-    return warns
-
-
 def check_labels_referenced():
-    warns = []
     labels = [] #re.findall("\\\\label\{([^\\}]+)\}", tex)
     for i, l in enumerate(tex_lines_clean):
         lab = re.search("\\\\label\{([^\\}]+)\}", l)
@@ -331,58 +569,34 @@ def check_labels_referenced():
                 break
         if not found:
             if not (lab[0].startswith("sec") or lab[0].startswith("subsec")):
-                warns.append((lab[1], "Label %s is not referenced" % lab[0], lab[2]))
-    return warns
+                yield (lab[1], "Label %s is not referenced" % lab[0], lab[2])
 
 
 def check_section_capitalization():
-    warns = []
     for i, l in enumerate(tex_lines):
         n = re.search("(section|paragraph)\\{([^\\}]+)\\}", l)
         if n:
-            try:
-                words = n.group(2).split(" ")
-                for w in words:
-                    if len(w) > 4 and w[0].islower():
-                        warns.append((i, "Wrong capitalization of header", (l.index(w), l.index(w) + 1)))
-                        break
-            except:
-                pass
-    return warns
+            words = n.group(2).split(" ")
+            for w in words:
+                if w and len(w) > thresholds["capitalization-length"] and w[0].islower():
+                    # the yield must not be inside a try, a bare except would also catch GeneratorExit
+                    yield (i, "Wrong capitalization of header", (l.index(w), l.index(w) + 1))
+                    break
 
 
 def check_quotation():
-    warns = []
     for i, l in enumerate(tex_lines_clean):
+        l = without_code(i, l)
         ws = re.search("[^\\\\]\"\\w+", l)
         we = re.search("\\w+\"", l)
         if (ws or we) and not in_code(i):
-            warns.append((i, "Wrong quotation, use `` and '' instead of \"", ws.span() if ws else we.span()))
-    return warns
-
-
-def check_hline_in_table():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        hl = re.search("\\\\hline", l)
-        if hl:
-            if "tabular" in in_env and in_env["tabular"]:
-                warns.append((i, "\\hline in table, consider using \\toprule, \\midrule, \\bottomrule.", hl.span()))
-    return warns
-
-
-def check_space_before_punctuation():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        s = re.search("\\s+[,.!?:;]", l)
-        if s and not in_any_env(i):
-            warns.append((i, "Spacing before punctuation", s.span()))
-    return warns
+            yield (i, "Wrong quotation, use `` and '' instead of \"", ws.span() if ws else we.span())
 
 
-def check_headers_without_text():
-    warns = []
-    for i, l in enumerate(tex_lines):
+def check_headers_without_text(start = 0, end = None):
+    # looks ahead beyond the end of the range until the next non-empty line
+    for i in range(start, len(tex_lines) if end is None else end):
+        l = tex_lines[i]
         n = re.search("(section|paragraph)\\{([^\\}]+)\\}", l)
         if n:
             nx = i
@@ -392,79 +606,50 @@ def check_headers_without_text():
                 if tex_lines[nx].strip().startswith("%"): continue
                 nn = re.search("(section|paragraph)\\{([^\\}]+)\\}", tex_lines[nx])
                 if nn:
-                    warns.append((i, "Section header without text before next header", n.span()))
+                    yield (i, "Section header without text before next header", n.span())
                 break
-    return warns
 
 
-def check_one_sentence_paragraphs():
-    warns = []
-    for i, l in enumerate(tex_lines):
+def check_one_sentence_paragraphs(start = 0, end = None):
+    for i in range(start, len(tex_lines) if end is None else end):
         if i > 0 and i < len(tex_lines) - 1:
-            if len(tex_lines[i - 1].strip()) == 0 and len(tex_lines[i + 1].strip()) == 0 and len(tex_lines[i].strip()) > 0:
+            if line_paragraph(i) == (i, i + 1):
                 if tex_lines[i].strip().startswith("\\"): continue
-                if ". " in tex_lines[i]: continue
-                warns.append((i, "One-sentence paragraph", (0, len(tex_lines[i]))))
-    return warns
+                if line_sentences(i): continue
+                yield (i, "One-sentence paragraph", (0, len(tex_lines[i])))
 
 
-def check_multiple_sentences_per_line():
-    warns = []
-    for i, l in enumerate(tex_lines_clean):
-        p = re.search("[\\.!?]\\s+\\w+", l.rstrip())
-        if p and "vs." not in l.rstrip():
-            warns.append((i, "Multiple sentences in one line", p.span()))
-    return warns
+def check_multiple_sentences_per_line(start = 0, end = None):
+    for i in range(start, len(tex_lines) if end is None else end):
+        starts = line_sentences(i)
+        if starts:
+            yield (i, "Multiple sentences in one line", starts[0].span())
+
+
+def check_conjunction_start(start = 0, end = None):
+    conjunctions = ["And", "Or", "But"]
+    for i in range(start, len(tex_lines) if end is None else end):
+        l = line_view(i, "rstrip")
+        for m in line_sentences(i):
+            if m.group(1) in conjunctions and l[m.end():m.end() + 1] in [" ", "\t", ","]:
+                yield (i, "Starting a sentence with a conjunction is discouraged", (m.start(), m.end() + 1))
+                break
+        m = re.match("(And|Or|But)[\\s,]", l)
+        if m:
+            yield (i, "Starting a sentence with a conjunction is discouraged", m.span())
 
 
 def check_unbalanced_brackets():
-    warns = []
     for i, l in enumerate(tex_lines):
         if l.count("(") != l.count(")") and not in_code(i):
+            l = without_code(i, l)
+            if l.count("(") == l.count(")"): continue
             first = min(l.index("(") if l.count("(") > 0 else len(l), l.index(")") if l.count(")") > 0 else len(l))
             last = max(l.rindex("(") if l.count("(") > 0 else len(l), l.rindex(")") if l.count(")") > 0 else len(l))
-            warns.append((i, "Mismatch of opening and closing parenthesis", (first, last)))
-    return warns
-
-
-def check_and_or():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        ao = re.search("and/or", l)
-        if ao:
-            warns.append((i, "And/or discouraged in academic writing", ao.span()))
-    return warns
-
-
-def check_ellipsis():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        el = re.search("\\w+\\.\\.\\.", l)
-        if el:
-            warns.append((i, "Ellipsis \"...\" discouraged in academic writing", el.span()))
-    return warns
-
-
-def check_etc():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        el = re.search("\\s+etc[\\.\\w]", l)
-        if el:
-            warns.append((i, "Unspecific \"etc\" discouraged in academic writing", el.span()))
-    return warns
-
-
-def check_footnote():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        fn = re.search("\\s*\\\\footnote\\{[^\\}]+\\}\\.", l)
-        if fn:
-            warns.append((i, "Footnote must be after the full stop", fn.span()))
-    return warns
+            yield (i, "Mismatch of opening and closing parenthesis", (first, last))
 
 
 def check_table_top_caption():
-    warns = []
     if "table" in envs:
         for table in envs["table"]:
             caption = -1
@@ -475,217 +660,140 @@ def check_table_top_caption():
                 if re.search("\\\\begin\\{tabular", tex_lines[intab]):
                     tab = intab
             if tab != -1 and caption != -1 and tab < caption:
-                warns.append((table[0], "Table caption must be above table"))
-    return warns
+                yield (table[0], "Table caption must be above table")
 
 
 
 def check_punctuation_end_of_line():
-    warns = []
     for i, l in enumerate(tex_lines_clean):
-        sl = l.strip()
+        sl = line_view(i, "strip")
         if len(sl) < 10: continue
-        if len(sl.split(" ")) < 8: continue
+        if sl.count(" ") < 7: continue
         if in_any_float(i): continue
-        if "lstlisting" in in_env and in_env["lstlisting"][i]: continue
+        if in_code(i): continue
         if sl.startswith("\\") or sl.startswith("%"): continue
         if sl.endswith("\\\\") or sl.endswith("}"): continue
-        if sl.endswith(".") or sl.endswith("!") or sl.endswith("?") or sl.endswith(":") or sl.endswith(";"): continue
-        p = re.search("\\s*[\\w})$]+[\\.!?}{:;\\\\]\\s*$", l.rstrip())
+        if line_ends_sentence(i): continue
+        p = re.search("\\s*[\\w})$]+[\\.!?}{:;\\\\]\\s*$", line_view(i, "rstrip"))
         if not p:
-            warns.append((i, "Line ends without punctuation", (len(l) - 2, len(l))))
-    return warns
-
-
-def check_table_vertical_lines():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        t = re.search("\\\\begin\\{tabular\\}\\{([^\\}]+)\\}", l)
-        if t and "|" in t.group(1):
-            warns.append((i, "Vertical lines in tables are discouraged", t.span()))
-    return warns
-
-
-def check_will():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        w = re.search("\\s+will\\s+", l)
-        if w:
-            warns.append((i, "Usage of \"will\" is discouraged.", w.span()))
-    return warns
+            yield (i, "Line ends without punctuation", (len(l) - 2, len(l)))
 
 
 def check_subsection_count():
-    warns = []
     last_section = -1
     subsections = []
     for i, l in enumerate(tex_lines):
         if re.search("\\\\section{", l):
             if last_section != -1 and len(subsections) == 1:
-                warns.append((last_section, "Section only has one subsection", re.search("\\\\section{", tex_lines[last_section]).span()))
+                yield (last_section, "Section only has one subsection", re.search("\\\\section{", tex_lines[last_section]).span())
             last_section = i
             subsections = []
         if re.search("\\\\subsection{", l):
             subsections.append(i)
-    return warns
 
 
 def check_mixed_compact_and_item():
-    warns = []
-    if "\\begin{compactenum}" in tex:
-        for i, l in enumerate(tex_lines):
-            it = re.search("\\\\begin\{enumerate\}", l)
-            if it:
-                warns.append((i, "compactenum mixed with enumerate", it.span()))
-    if "\\begin{compactitem}" in tex:
-        for i, l in enumerate(tex_lines):
-            it = re.search("\\\\begin\{itemize\}", l)
-            if it:
-                warns.append((i, "compactitem mixed with itemize", it.span()))
-    return warns
+    compactenum = "\\begin{compactenum}" in tex
+    compactitem = "\\begin{compactitem}" in tex
+    for i, l in enumerate(tex_lines):
+        it = re.search("\\\\begin\{enumerate\}", l)
+        if it and compactenum:
+            yield (i, "compactenum mixed with enumerate", it.span())
+        it = re.search("\\\\begin\{itemize\}", l)
+        if it and compactitem:
+            yield (i, "compactitem mixed with itemize", it.span())
 
 
 def check_center_in_float():
-    warns = []
     if "center" in envs:
         for c in envs["center"]:
             if in_any_float(c[0]):
-                warns.append((c[0], "Use \\centering instead of \\begin{center} inside floats", re.search("\\\\begin\{center\}", tex_lines[c[0]]).span()))
-    return warns
-
-
-def check_appendix():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        ap = re.search("\\\\begin\{appendix\}", l)
-        if ap:
-            warns.append((i, "Use \\appendix instead of \\begin{appendix}", ap.span()))
-    return warns
-
-
-def check_eqnarray():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        ap = re.search("\\\\begin\{eqnarray\}", l)
-        if ap:
-            warns.append((i, "Use \\begin{align} instead of \\begin{eqnarray}", ap.span()))
-    return warns
-
-
-def check_acm_pc():
-    # based on https://www.acm.org/diversity-inclusion/words-matter
-    warns = []
-    replace = [
-        ("\\bsupremacy\\b", "advantage"),
-        ("\\bmaster\\b", "main/primary/leader/parent/host"),
-        ("\\bslave\\b", "secondary/replica/follower/child/worker/client"),
-        ("\\bhe\\b", "they"),
-        ("\\bshe\\b", "they"),
-        ("\\bhis\\b", "their"),
-        ("\\bhers?\\b", "their/them"),
-        ("\\bhim\\b", "them"),
-        ("\\bmale\\bconnector\\b", "plug"),
-        ("\\bfemale\\bconnector\\b", "socket"),
-        ("\\bblind\\b", "anonymous"),
-        ("\\bblack\\-?\\s?list\\b", "blocklist/unapprovedlist"),
-        ("\\bwhite\\-?\\s?list\\b", "allowlist/approvedlist"),
-        ("\\bblack\\-?\\s?hat\\b", "unethical attacker/hostile force"),
-        ("\\bwhite\\-?\\s?hat\\b", "ethical attacker/friendly force"),
-        ("\\bblack\\-?\\s?box\\b", "opaque box"),
-        ("\\bwhite\\-?\\s?box\\b", "clear box"),
-        ("\\baverage\\s?user\\b", "common/standard/typical user"),
-        ("\\babort\\s?child\\b", "cancel/force quit/stop/end/finalize"),
-        ("\\bterminate\\s?child\\b", "cancel/force quit/stop/end/finalize"),
-        ("\\bdark\\-?\\s?pattern\\b", "deceptive design"),
-        ("\\bdummy\\-?\\s?head\\b", "temporary head"),
-        ("\\bgender\\-?\\s?bender\\b", "plug-socket adapter"),
-        ("\\borphaned\\-?\\s?object\\b", "unreferenced/unlinked object"),
-        ("\\bsanity\\-?\\s?check", "coherence/quick/well-formedness check")
-    ]
-    for i, l in enumerate(tex_lines):
-        for r in replace:
-            w = re.search(r[0], l)
-            if w:
-                warns.append((i, "Discouraged term \"%s\", consider replacing with \"%s\"" % (w.group(), r[1]), w.span()))
-    return warns
+                yield (c[0], "Use \\centering instead of \\begin{center} inside floats", re.search("\\\\begin\{center\}", tex_lines[c[0]]).span())
 
 
 def check_cite_noun():
-    warns = []
     for i, l in enumerate(tex_lines):
-        ap = re.search("\\b(in|from|by|and|or)[\\s~]\\\\cite", l.lower())
+        ap = re.search("\\b(in|from|by|and|or)[\\s~]\\\\cite", line_view(i, "lower", False))
         if ap:
-            warns.append((i, "Citation is used as noun", ap.span()))
+            yield (i, "Citation is used as noun", view_span(i, "lower", ap.span(), False))
         ap = re.search("^\\s*\\\\cite", l)
         if ap:
-            warns.append((i, "Citation at the beginning of a sentence (probably as noun)", ap.span()))
-    return warns
+            yield (i, "Citation at the beginning of a sentence (probably as noun)", ap.span())
 
 
 def check_cite_duplicate():
-    warns = []
     for i, l in enumerate(tex_lines):
-        cites = re.findall("\\\\(no)?citeA?\\{([^\\}]+)\\}", l)
-        for cite in cites:
-            c = [x.strip().split(",") for x in cite]
+        for cite in re.finditer("\\\\(no)?citeA?\\{([^\\}]+)\\}", l):
+            c = [x.strip().split(",") for x in cite.groups("")]
             c = [item for sublist in c for item in sublist]
             if len(c) != len(list(set(c))):
                 seen = set()
                 dupes = [x for x in c if x in seen or seen.add(x)]
-                warns.append((i, "Duplicate citation key: %s" % ", ".join(dupes), re.search(dupes[0], l).span()))
-    return warns
+                keys = [x.strip() for x in cite.group(2).split(",")]
+                if "" in dupes or "" in keys:
+                    yield (i, "Duplicate citation key: %s" % ", ".join(dupes), re.search(dupes[0], l).span())
+                else:
+                    fix = [(i, cite.start(2), cite.end(2), ",".join(sorted(set(keys), key = keys.index)))]
+                    yield (i, "Duplicate citation key: %s" % ", ".join(dupes), re.search(dupes[0], l).span(), fix)
 
 
-def check_multicite():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        cites = re.search("\\\\citeA?\\{[^\\}]+\\}\\s*\\\\citeA?\\{[^\\}]+\\}", l)
-        if cites:
-            warns.append((i, "Multiple \\cite commands, use multiple citation keys in one \\cite instead", cites.span()))
-    return warns
+def cited_keys(l):
+    for c in re.finditer(cite_command, l):
+        pos = c.start(1)
+        for key in c.group(1).split(","):
+            if key.strip():
+                start = pos + len(key) - len(key.lstrip())
+                yield key.strip(), (start, start + len(key.strip()))
+            pos += len(key) + 1
 
 
-def check_emptycite():
-    warns = []
-    for i, l in enumerate(tex_lines):
-        cites = re.search("\\\\citeA?\\{\\s*\\}", l)
-        if cites:
-            warns.append((i, "Empty citation key", cites.span()))
-    return warns
+def check_suppression_switches():
+    # reported without a line, as the comment line itself never shows warnings
+    for i, x in suppression_errors:
+        yield (-1, "Unknown switch '%s' in paperlint comment in line %d" % (x, i + 1))
+
 
-def check_conjunction_start():
-    warns = []
+def check_cite_undefined():
+    if not bib_index: return
     for i, l in enumerate(tex_lines_clean):
-        p = re.search("[\\.!?]\\s+(And|Or|But)[\\s,]", l.rstrip())
-        if p:
-            warns.append((i, "Starting a sentence with a conjunction is discouraged", p.span()))
-        p = re.search("^(And|Or|But)[\\s,]", l.rstrip())
-        if p:
-            warns.append((i, "Starting a sentence with a conjunction is discouraged", p.span()))
-    return warns
+        for key, span in cited_keys(l):
+            if key != "*" and key not in bib_index:
+                yield (i, "Citation key %s is not defined in any bibliography file" % key, span)
+
+
+def check_bib_duplicate():
+    for key in bib_index:
+        if len(bib_index[key]) > 1:
+            yield (-1, "Bibliography entry %s is defined multiple times: %s" % (key, ", ".join("%s:%d" % (f, l + 1) for f, l in bib_index[key])))
+
+
+def check_bib_unused():
+    if "*" in bib_cited: return
+    for key in bib_index:
+        if key not in bib_cited:
+            f, l = bib_index[key][0]
+            yield (-1, "Bibliography entry %s (%s:%d) is never cited" % (key, f, l + 1))
 
 
 def check_brackets_space():
-    warns = []
-    for i, l in enumerate(tex_lines_clean):
-        if in_code(i) or in_equation(i) or (len(l.strip()) > 0 and l.strip()[0] in ["\\", "%"]): continue
-        p = re.search("[^\\s\\{~\\\\]\\([^(s\\))]", l.rstrip())
+    for i in range(len(tex_lines_clean)):
+        if in_code(i) or in_equation(i) or line_view(i, "strip")[:1] in ["\\", "%"]: continue
+        l = without_code(i, line_view(i, "rstrip"))
+        p = re.search("[^\\s\\{~\\\\]\\([^(s\\))]", l)
         if p:
-            if l.rstrip()[:p.span()[1]].count("$") % 2 == 0: # only if it is not in an equation
-                warns.append((i, "There must be a space before an opening parenthesis", p.span()))
-        p = re.search("\\(\\s", l.rstrip())
+            if not in_math(i, p.span()[0] + 1):
+                yield (i, "There must be a space before an opening parenthesis", p.span())
+        p = re.search("\\(\\s", l)
         if p:
-            if l.rstrip()[:p.span()[1]].count("$") % 2 == 0: # only if it is not in an equation
-                warns.append((i, "There must be no space after an opening parenthesis", p.span()))
-        p = re.search("\\s\\)", l.rstrip())
+            if not in_math(i, p.span()[0]):
+                yield (i, "There must be no space after an opening parenthesis", p.span())
+        p = re.search("\\s\\)", l)
         if p:
-            if l.rstrip()[:p.span()[1]].count("$") % 2 == 0: # only if it is not in an equation
-                warns.append((i, "There must be no space before a closing parenthesis", p.span()))
-    return warns  
+            if not in_math(i, p.span()[0] + 1):
+                yield (i, "There must be no space before a closing parenthesis", p.span())
 
 
-def check_acronym_capitalization():
-    warns = []
+def find_acronyms():
     acronyms = []
     acronym_first = {}
     for i, l in enumerate(tex_lines_clean):
@@ -697,103 +805,43 @@ def check_acronym_capitalization():
                 continue
             acronyms.append(p.group())
             acronym_first[p.group()] = i
+    return acronyms, acronym_first
+
+
+def check_acronym_capitalization():
+    acronyms, acronym_first = find_acronyms()
+    patterns = [(a, re.compile("\\b%s\\b" % a)) for a in acronyms]
     for i, l in enumerate(tex_lines_clean):
         if in_code(i): continue
-        for a in acronyms:
-            p = re.search("\\b%s\\b" % a, l.upper())
+        for a, pattern in patterns:
+            p = pattern.search(line_view(i, "upper"))
             if p:
-                found = l[p.span()[0]:p.span()[1]]
+                span = view_span(i, "upper", p.span())
+                found = l[span[0]:span[1]]
                 if found[-1] == 's': # ignore plural
                     found = found[:-1]
-                if l[:p.span()[0]].count("{") != l[:p.span()[0]].count("}"): # probably inside a reference or label
+                if l.count("{", 0, span[0]) != l.count("}", 0, span[0]): # probably inside a reference or label
                     continue
                 if "@" in l: # probably a mail address
                     continue
-                if p.span()[0] > 0 and l[p.span()[0] - 1] == '\\':
+                if span[0] > 0 and l[span[0] - 1] == '\\':
                     continue # probably a macro
                 if not found.isupper():
-                    warns.append((i, "(Potential) acronym with wrong capitalization (first defined in Line %d)" % (acronym_first[a] + 1), p.span()))
-    return warns  
-
-def check_numeral():
-    warns = []
-    replace = [
-        ("\\bthree\\b", "3"),
-        ("\\bfour\\b", "4"),
-        ("\\bfive\\b", "5"),
-        ("\\bsix\\b", "6"),
-        ("\\bseven\\b", "7"),
-        ("\\beight\\b", "8"),
-        ("\\bnine\\b", "9"),
-        ("\\bten\\b", "10"),
-        ("\\beleven\\b", "11"),
-        ("\\btwelve\\b", "12")
-    ]
-    for i, l in enumerate(tex_lines):
-        for r in replace:
-            w = re.search(r[0], l)
-            if w:
-                warns.append((i, "Numeral \"%s\" should be replaced with \"%s\"" % (w.group(), r[1]), w.span()))
-    return warns
-
-
-def check_colors():
-    warns = []
-    cols = [
-        "\\bred\\b",
-        "\\bgreen\\b",
-        "\\bblue\\b",
-        "\\byellow\\b",
-        "\\borange\\b",
-        "\\bmagenta\\b",
-        "\\bcyan\\b",
-        "\\bbrown\\b",
-        "\\bpink\\b"        
-    ]
-    modifiers = [
-        "\\bdott?(ed)?\\b",
-        "\\bdash(ed)?\\b",
-        "\\bthick\\b",
-        "\\bthin\\b",
-        "\\bdash-?dotted\\b",
-        "\\bhatch",
-        "\\bcross",
-        "\\bcheck",
-        "\\bpattern"
-    ]
-    for i, l in enumerate(tex_lines):
-        for c in cols:
-            w = re.search(c, l)
-            if w:
-                # check for = or { in front of color
-                if w.span()[0] > 0 and (l[w.span()[0] - 1] == "=" or l[w.span()[0] - 1] == "{"): continue
-                # reduce false positives by looking for modifiers
-                mod = False
-                for m in modifiers:
-                    if re.search(m, l):
-                        mod = True
-                        break
-                if not mod:
-                    warns.append((i, "Colors (\"%s\") without a modifier such as dashed/dotted/... should be avoided." % (w[0]), w.span()))
-    return warns
-
+                    yield (i, "(Potential) acronym with wrong capitalization (first defined in Line %d)" % (acronym_first[a] + 1), span)
 
 def check_inconsistent_word_style():
-    warns = []
     word_style = {}
     for i, l in enumerate(tex_lines_clean):
         styled = re.search("\\\\text([^\\{]+)\{([^\\}]+)\}", l)
         if styled and "newcommand" not in l:
             if styled[2] in word_style:
                 if styled[1] != word_style[styled[2]][1][1]:
-                    warns.append((i, "Word '%s' is styled inconsistently, used with \\text%s before at line %d" % (styled[2], word_style[styled[2]][1][1], word_style[styled[2]][0] + 1), styled.span()))
+                    yield (i, "Word '%s' is styled inconsistently, used with \\text%s before at line %d" % (styled[2], word_style[styled[2]][1][1], word_style[styled[2]][0] + 1), styled.span())
             else:
                 word_style[styled[2]] = (i, styled)
-    return warns
 
 
 def check_missing_word_style():
-    warns = []
     word_style = {}
     for i, l in enumerate(tex_lines_clean):
         styled = re.search("\\\\text([^\\{]+)\{([^\\}]+)\}", l)
@@ -810,38 +858,519 @@ def check_missing_word_style():
             if word_style[s][2] == 1: continue # reduce false positives, e.g., when the word is emphasized once
             try:
                 w = re.search("\\b%s\\b" % s, l)
-            except:
+            except re.error:
                 continue
             if w:
                 if w.span()[0] > 0 and l[w.span()[0] - 1] != "{":
-                    warns.append((i, "Word '%s' used without a style, used with \\text%s before at line %d (and %d other location%s)" % (s, word_style[s][1][1], word_style[s][0] + 1, word_style[s][2], "s" if word_style[s][2] == 1 else ""), w.span()))
-    return warns
+                    yield (i, "Word '%s' used without a style, used with \\text%s before at line %d (and %d other location%s)" % (s, word_style[s][1][1], word_style[s][0] + 1, word_style[s][2], "s" if word_style[s][2] == 1 else ""), w.span())
+
+
+acm_pc_terms = [
+    # based on https://www.acm.org/diversity-inclusion/words-matter
+    ("\\bsupremacy\\b", "advantage"),
+    ("\\bmaster\\b", "main/primary/leader/parent/host"),
+    ("\\bslave\\b", "secondary/replica/follower/child/worker/client"),
+    ("\\bhe\\b", "they"),
+    ("\\bshe\\b", "they"),
+    ("\\bhis\\b", "their"),
+    ("\\bhers?\\b", "their/them"),
+    ("\\bhim\\b", "them"),
+    ("\\bmale\\bconnector\\b", "plug"),
+    ("\\bfemale\\bconnector\\b", "socket"),
+    ("\\bblind\\b", "anonymous"),
+    ("\\bblack\\-?\\s?list\\b", "blocklist/unapprovedlist"),
+    ("\\bwhite\\-?\\s?list\\b", "allowlist/approvedlist"),
+    ("\\bblack\\-?\\s?hat\\b", "unethical attacker/hostile force"),
+    ("\\bwhite\\-?\\s?hat\\b", "ethical attacker/friendly force"),
+    ("\\bblack\\-?\\s?box\\b", "opaque box"),
+    ("\\bwhite\\-?\\s?box\\b", "clear box"),
+    ("\\baverage\\s?user\\b", "common/standard/typical user"),
+    ("\\babort\\s?child\\b", "cancel/force quit/stop/end/finalize"),
+    ("\\bterminate\\s?child\\b", "cancel/force quit/stop/end/finalize"),
+    ("\\bdark\\-?\\s?pattern\\b", "deceptive design"),
+    ("\\bdummy\\-?\\s?head\\b", "temporary head"),
+    ("\\bgender\\-?\\s?bender\\b", "plug-socket adapter"),
+    ("\\borphaned\\-?\\s?object\\b", "unreferenced/unlinked object"),
+    ("\\bsanity\\-?\\s?check", "coherence/quick/well-formedness check")
+]
+
+# replacing "he" or "she" with "they" also requires changing the verb, so they are only reported
+pronoun_terms = ["\\bhe\\b", "\\bshe\\b"]
+
+numerals = [
+    ("\\bthree\\b", "3"),
+    ("\\bfour\\b", "4"),
+    ("\\bfive\\b", "5"),
+    ("\\bsix\\b", "6"),
+    ("\\bseven\\b", "7"),
+    ("\\beight\\b", "8"),
+    ("\\bnine\\b", "9"),
+    ("\\bten\\b", "10"),
+    ("\\beleven\\b", "11"),
+    ("\\btwelve\\b", "12")
+]
+
+colors = [
+    "\\bred\\b",
+    "\\bgreen\\b",
+    "\\bblue\\b",
+    "\\byellow\\b",
+    "\\borange\\b",
+    "\\bmagenta\\b",
+    "\\bcyan\\b",
+    "\\bbrown\\b",
+    "\\bpink\\b"
+]
+
+color_modifiers = [
+    "\\bdott?(ed)?\\b",
+    "\\bdash(ed)?\\b",
+    "\\bthick\\b",
+    "\\bthin\\b",
+    "\\bdash-?dotted\\b",
+    "\\bhatch",
+    "\\bcross",
+    "\\bcheck",
+    "\\bpattern"
+]
 
 
-def print_warnings(warn, output = True):
+def fix_environment(i, m, begin, end):
+    # replace the \begin of the environment and its matching \end
+    env = re.search("\\\\begin\\{(\\w+)\\}", m.group()).group(1)
+    for r in envs.get(env, []):
+        if r[0] == i:
+            e = tex_lines[r[1]].find("\\end{%s}" % env)
+            if e == -1: break
+            return [(i, m.start(), m.end(), begin), (r[1], e, e + len("\\end{%s}" % env), end)]
+    return None
+
+
+def fix_eqnarray(i, l, m):
+    # eqnarray uses "a &=& b" for its three columns, align only needs "a &= b"
+    edits = fix_environment(i, m, "\\begin{align}", "\\end{align}")
+    if edits is None: return None
+    for line in range(i, edits[1][0] + 1):
+        start = m.end() if line == i else 0
+        end = edits[1][1] if line == edits[1][0] else len(tex_lines[line])
+        amps = [a.start() for a in re.finditer("(?<!\\\\)&", tex_lines[line][start:end])]
+        if len(amps) == 2:
+            edits.append((line, start + amps[1], start + amps[1] + 1, ""))
+        elif len(amps) != 0:
+            # anything else than the usual three columns cannot be converted reliably
+            return None
+    return edits
+
+
+def fix_multicite(i, l, m):
+    cites = re.findall("\\\\(citeA?)\\{([^\\}]+)\\}", m.group())
+    if cites[0][0] != cites[1][0]: return None
+    return [(i, m.start(), m.end(), "\\%s{%s,%s}" % (cites[0][0], cites[0][1], cites[1][1]))]
+
+
+def in_command_argument(l, col):
+    # whether the column is inside a {...} group that is the argument of a command, e.g., \label{...}
+    groups = []
+    for b in re.finditer("\\\\.|[\\{\\}]", l[:col]):
+        if b.group() == "{":
+            groups.append(b.start())
+        elif b.group() == "}" and groups:
+            groups.pop()
+    return any(re.search("\\\\[a-zA-Z@]+\\*?(?:\\[[^\\]]*\\]|\\{[^\\{\\}]*\\})*$", l[:g]) for g in groups)
+
+
+def fix_text(text):
+    # replace the match, but never inside command arguments such as labels, references, or file names
+    return lambda i, l, m: None if in_command_argument(l, m.start()) else [(i, m.start(), m.end(), text)]
+
+
+def color_without_modifier(i, l, m):
+    # check for = or { in front of color
+    if m.span()[0] > 0 and (l[m.span()[0] - 1] == "=" or l[m.span()[0] - 1] == "{"):
+        return False
+    # reduce false positives by looking for modifiers
+    return not re.search("|".join(color_modifiers), l)
+
+
+# Rules that only look at a single line: (switch, lines, regex, message, condition[, fix]).
+# "lines" selects the raw lines, the comment-free lines or the right-stripped
+# comment-free lines. The regex is either a string or a function returning it, in
+# case it depends on the configuration. The message is either a string or a function of the match,
+# the optional condition gets the line number, the line, and the match.
+# The fix is either the replacement for the match or a function of line number,
+# line, and match that returns a list of edits (line, start, end, replacement).
+# All of them are evaluated together in one pass over the document.
+line_checks = [
+    ("cite-space",          "raw",   "[^ ~]\\\\cite", "No space before \\cite", lambda i, l, m: not "\\etal\\cite" in l),
+    ("dimensions",          "raw",   "\\\\textwidth", "use \\hsize instead of \\textwidth", None),
+    ("dimensions",          "raw",   "\\\\linewidth", "use \\hsize instead of \\linewidth", None),
+    ("todo",                "clean", "TODO", "TODO found", None),
+    ("note",                "clean", "\\\\note", "\\note found", None),
+    ("note",                "clean", "\\\\todo", "\\todo found", None),
+    ("math-numbers",        "raw",   "\\$\\d+\\$", "Number in math mode, consider using siunit instead", lambda i, l, m: not in_any_float(i)),
+    ("si",                  "raw",   lambda: "[\\s\(]\\d{%d,}[\\s\),\.]" % thresholds["si-digits"], "Large number without formating, consider using siunit", lambda i, l, m: not in_any_float(i)),
+    ("comment-space",       "raw",   "[^\\s\\\\\\}\\{%]+%", "Comment without a whitespace before", lambda i, l, m: l.strip()[0] != "%" and not in_code(i) and not in_verbatim(i, m.end() - 1)),
+    ("percentage",          "raw",   "\\d+\\s*\\\\%", "Number with percent without siunit", None),
+    ("short-form",          "clean", "[^`%]\\w+'[a-rt-z]", "Contracted form used", None),
+    ("hline",               "raw",   "\\\\hline", "\\hline in table, consider using \\toprule, \\midrule, \\bottomrule.", lambda i, l, m: "tabular" in in_env and in_env["tabular"]),
+    ("punctuation-space",   "raw",   "\\s+[,.!?:;]", "Spacing before punctuation", lambda i, l, m: not in_any_env(i), lambda i, l, m: [(i, m.start(), m.end(), m.group()[-1])]),
+    ("and-or",              "raw",   "and/or", "And/or discouraged in academic writing", None),
+    ("ellipsis",            "raw",   "\\w+\\.\\.\\.", "Ellipsis \"...\" discouraged in academic writing", None),
+    ("etc",                 "raw",   "\\s+etc[\\.\\w]", "Unspecific \"etc\" discouraged in academic writing", None),
+    ("footnote",            "raw",   "\\s*\\\\footnote\\{[^\\}]+\\}\\.", "Footnote must be after the full stop", None),
+    ("vline",               "raw",   "\\\\begin\\{tabular\\}\\{([^\\}]+)\\}", "Vertical lines in tables are discouraged", lambda i, l, m: "|" in m.group(1)),
+    ("will",                "raw",   "\\s+will\\s+", "Usage of \"will\" is discouraged.", None),
+    ("appendix",            "raw",   "\\\\begin\{appendix\}", "Use \\appendix instead of \\begin{appendix}", None, lambda i, l, m: fix_environment(i, m, "\\appendix", "")),
+    ("eqnarray",            "raw",   "\\\\begin\{eqnarray\}", "Use \\begin{align} instead of \\begin{eqnarray}", None, fix_eqnarray),
+    ("multiple-cites",      "raw",   "\\\\citeA?\\{[^\\}]+\\}\\s*\\\\citeA?\\{[^\\}]+\\}", "Multiple \\cite commands, use multiple citation keys in one \\cite instead", None, fix_multicite),
+    ("cite-empty",          "raw",   "\\\\citeA?\\{\\s*\\}", "Empty citation key", None)
+] + [
+    ("inclusion", "raw", t[0], lambda m, t=t: "Discouraged term \"%s\", consider replacing with \"%s\"" % (m.group(), t[1]), None, fix_text(t[1]) if "/" not in t[1] and t[0] not in pronoun_terms else None) for t in acm_pc_terms
+] + [
+    ("numeral", "raw", n[0], lambda m, n=n: "Numeral \"%s\" should be replaced with \"%s\"" % (m.group(), n[1]), None, fix_text(n[1])) for n in numerals
+] + [
+    ("colors", "raw", c, lambda m: "Colors (\"%s\") without a modifier such as dashed/dotted/... should be avoided." % (m[0]), color_without_modifier) for c in colors
+]
+
+citation_commands = ["cite", "citeA", "citep", "citet", "citealp", "citealt", "citeauthor", "citeyear", "nocite", "parencite", "textcite", "autocite", "footcite"]
+cite_command = "\\\\(?:%s)\\*?(?:\\[[^\\]]*\\]){0,2}\\{([^\\}]*)\\}" % "|".join(citation_commands)
+bib_entry = "@(\\w+)\\s*[\\{\\(]\\s*([^,\\s\\}\\)]+)\\s*,"
+bib_index = None
+bib_cited = set()
+
+line_rules = None
+line_warnings = None
+# results of the line-local rules per line, reused for unchanged lines after --fix
+line_cache = None
+line_warnings_switches = set(x[0] for x in line_checks)
+# rules that only need a few lines of context and can be checked on a range of lines
+line_range_switches = set(["single-sentence", "two-header", "multiple-sentences", "conjunction-start"])
+line_chunk_size = 5000
+
+
+def required_literal(pattern):
+    # the longest text that every match of the pattern contains, or None if there is none
+    runs = [""]
+    depth = 0
+    k = 0
+    while k < len(pattern):
+        c = pattern[k]
+        literal = None
+        if c == "\\":
+            k += 1
+            if not pattern[k].isalnum():
+                literal = pattern[k]
+        elif c == "[":
+            # skip the character class
+            k += 1
+            if pattern[k] == "^": k += 1
+            if pattern[k] == "]": k += 1
+            while pattern[k] != "]":
+                if pattern[k] == "\\": k += 1
+                k += 1
+        elif c == "{" and re.match("\\{\\d*(,\\d*)?\\}", pattern[k:]):
+            k = pattern.index("}", k)
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|":
+            if depth == 0: return None
+        elif c not in ".^$?*+":
+            literal = c
+        quantifier = pattern[k + 1:k + 2]
+        if literal is None or depth > 0 or quantifier in ["?", "*", "{"]:
+            # groups are not looked at, and optional characters end the text
+            runs.append("")
+        else:
+            runs[-1] += literal
+            if quantifier == "+": runs.append("")
+        k += 1
+    return max(runs, key = len) or None
+
+
+def compile_line_checks():
+    global line_rules
+    # rules that have a literal text are only tried on the lines that contain it, which are found
+    # with str.find over the whole document; the other rules are tried on every line
+    line_rules = ([], {})
+    index = {c[2]: idx for idx, c in enumerate(checks)}
+    for pos, x in enumerate(line_checks):
+        pattern = x[2]() if callable(x[2]) else x[2]
+        rule = (pos, x[0], index[x[0]], x[1], re.compile(pattern), x[3], x[4], x[5] if len(x) > 5 else None)
+        literal = required_literal(pattern)
+        if literal is None:
+            line_rules[0].append(rule)
+        else:
+            line_rules[1].setdefault((x[1], literal), []).append(rule)
+
+
+def line_text(lines):
+    # the document and the offsets of its lines, for the raw or the comment-free lines
+    if lines == "raw":
+        return tex, line_offsets
+    if "clean-text" not in views:
+        offsets = [0]
+        for l in tex_lines_clean[:-1]:
+            offsets.append(offsets[-1] + len(l) + 1)
+        views["clean-text"] = ("\n".join(tex_lines_clean), offsets)
+    return views["clean-text"]
+
+
+def literal_lines(lines, literal, start, end):
+    # the lines in [start, end) that contain the literal, each line is searched only once
+    text, offsets = line_text(lines)
+    limit = offsets[end] if end < len(offsets) else len(text)
+    pos = text.find(literal, offsets[start], limit)
+    while pos != -1:
+        i = bisect.bisect_right(offsets, pos) - 1
+        yield i
+        if i + 1 >= end: break
+        pos = text.find(literal, offsets[i + 1], limit)
+
+
+def line_warning(i, m, message, pos, fix):
+    # a fix is only referenced by the position of the rule in line_checks, line_fix() computes
+    # its edits when --fix applies it, so that plain runs do not pay for the fixes
+    w = (i, message(m) if callable(message) else message, m.span())
+    if fix is not None:
+        w += (pos, )
+    return w
+
+
+def line_fix(pos, i, start):
+    # the edits of the fix of a line-local rule, for its match at the start column
+    x = line_checks[pos]
+    l = tex_lines[i] if x[1] == "raw" else tex_lines_clean[i]
+    m = re.compile(x[2]() if callable(x[2]) else x[2]).match(l, start)
+    if not callable(x[5]):
+        return [(i, m.start(), m.end(), x[5])]
+    edits = x[5](i, l, m)
+    if edits is not None and (not isinstance(edits, list) or any(len(e) != 4 for e in edits)):
+        raise ValueError("Fix for line %d must be a list of edits (line, start, end, replacement), got %r" % (i + 1, edits))
+    return edits
+
+
+def scan_lines(start = 0, end = None):
+    if line_rules is None:
+        compile_line_checks()
+    end = len(tex_lines) if end is None else end
+    candidates = {}
+    for (lines, literal), rules in line_rules[1].items():
+        for i in literal_lines(lines, literal, start, end):
+            candidates.setdefault(i, []).extend(rules)
+    for i in range(start, end):
+        if line_cache is not None and i in line_cache:
+            yield from line_cache[i]
+            continue
+        found = []
+        # rules that are suppressed on this line are not evaluated at all
+        suppressed = None
+        if in_intervals(suppressed_any, i):
+            suppressed = set(r for r in suppressions if r is not None and in_intervals(suppressions[r], i))
+        rules = line_rules[0] + candidates[i] if i in candidates else line_rules[0]
+        if suppressed is not None and in_intervals(suppressions[None], i):
+            rules = []
+        # evaluate the rules in the order of the table
+        for pos, switch, rule, lines, regex, message, condition, fix in sorted(rules):
+            if suppressed is not None and rule in suppressed: continue
+            l = tex_lines[i] if lines == "raw" else tex_lines_clean[i]
+            m = regex.search(l)
+            if m and (condition is None or condition(i, l, m)):
+                found.append((switch, line_warning(i, m, message, pos, fix)))
+        if line_cache is not None:
+            line_cache[i] = found
+        yield from found
+
+
+def run_line_checks(start = 0, end = None):
+    global line_warnings
+    line_warnings = {x[0]: [] for x in line_checks}
+    for switch, w in scan_lines(start, end):
+        line_warnings[switch].append(w)
+
+
+def stream_line_checks(file_id):
+    index = {c[2]: idx for idx, c in enumerate(checks)}
+    # within a line, order the warnings like the rules in the checks list
+    for line, lw in itertools.groupby(scan_lines(), key = lambda x: x[1][0]):
+        for switch, w in sorted(lw, key = lambda x: index[x[0]]):
+            yield Diagnostic.from_warning(file_id, index[switch], w)
+
+
+def line_check(switch):
+    return lambda: line_warnings[switch]
+
+
+class Diagnostic:
+    # compact representation of a single warning, there can be a lot of them on large projects
+    __slots__ = ("file", "line", "start", "end", "rule", "message", "fix")
+
+    def __init__(self, file, line, rule, message, span = None, fix = None):
+        self.file = file
+        self.line = line
+        self.rule = rule
+        self.message = message
+        self.start, self.end = span if span else (None, None)
+        self.fix = fix
+
+    @staticmethod
+    def from_warning(file, rule, w):
+        return Diagnostic(file, w[0], rule, w[1], w[2] if len(w) > 2 else None, w[3] if len(w) > 3 else None)
+
+    def key(self):
+        return (self.file, self.line, self.rule, self.start, self.end, self.message)
+
+    def __lt__(self, other):
+        return (self.file, self.line, self.rule) < (other.file, other.line, other.rule)
+
+    def __eq__(self, other):
+        return self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+
+def apply_fixes(diags, enabled):
+    # take all non-overlapping edits, a fix consisting of multiple edits is applied completely or not at all
+    taken = {}
+    edits = []
+    fixed = 0
+    for d in diags:
+        if d.fix is None or not enabled >> d.rule & 1: continue
+        fix = line_fix(d.fix, d.line, d.start) if isinstance(d.fix, int) else d.fix
+        if not fix: continue
+        # code in listings, verbatim, or \verb is never changed
+        if any(in_code(line) or in_verbatim(line, s) for line, s, e, text in fix): continue
+        if any(s < te and ts < e for line, s, e, text in fix for ts, te in taken.get(line, [])): continue
+        for line, s, e, text in fix:
+            taken.setdefault(line, []).append((s, e))
+        edits += fix
+        fixed += 1
+
+    lines = list(tex_lines)
+    # apply the edits of a line from right to left, so the columns of the remaining edits stay valid
+    for line, s, e, text in sorted(edits, reverse = True):
+        lines[line] = lines[line][:s] + text + lines[line][e:]
+    return lines, fixed
+
+
+def write_file(file, content):
+    # keep the encoding and line endings of the file that was read
+    newline = tex_newline
+    # write to a temporary file next to the original and replace it, so the file is never half-written
+    import shutil
+    tmp = file + ".paperlint-tmp"
+    with open(tmp, "w", encoding = tex_encoding, newline = newline) as f:
+        f.write(content)
+    shutil.copymode(file, tmp)
+    os.replace(tmp, file)
+
+
+def fix_file(file, file_id, jobs, enabled):
+    global line_cache
+    line_cache = {}
+    lines, fixed = apply_fixes(list(stream_checks(file_id, jobs)), enabled)
+    if fixed:
+        write_file(file, "\n".join(lines))
+        # only the changed lines have to be checked again by the line-local rules,
+        # unless the environments or suppressions changed, which the rules also depend on
+        old_env = in_env
+        old_suppressions = suppressions
+        changed = [i for i in range(len(lines)) if lines[i] != tex_lines[i]]
+        set_text("\n".join(lines))
+        preprocess()
+        if in_env != old_env or suppressions != old_suppressions:
+            line_cache = {}
+        for i in changed:
+            line_cache.pop(i, None)
+    return fixed
+
+
+def bib_cache_file(bib):
+    import hashlib
+    cache_dir = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "paperlint")
+    return os.path.join(cache_dir, hashlib.sha1(os.path.abspath(bib).encode()).hexdigest() + ".json")
+
+
+def parse_bib(content):
+    entries = []
+    line = 0
+    pos = 0
+    for e in re.finditer(bib_entry, content):
+        if e.group(1).lower() in ["comment", "string", "preamble"]: continue
+        line += content.count("\n", pos, e.start())
+        pos = e.start()
+        entries.append((e.group(2), line))
+    return entries
+
+
+def load_bib(bib):
+    # entries are cached by modification time and size, and by content hash if the file was only touched
+    import hashlib
+    import json
+    cache_file = bib_cache_file(bib)
+    stat = os.stat(bib)
+    try:
+        cache = json.load(open(cache_file))
+        if cache["mtime"] == stat.st_mtime and cache["size"] == stat.st_size:
+            return cache["entries"]
+    except (OSError, ValueError, KeyError):
+        cache = None
+
+    content = open(bib, "rb").read()
+    digest = hashlib.sha1(content).hexdigest()
+    if cache and cache.get("sha1") == digest:
+        entries = cache["entries"]
+    else:
+        entries = parse_bib(content.decode("utf-8", errors = "replace"))
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok = True)
+        with open(cache_file + ".tmp", "w") as f:
+            json.dump({"mtime": stat.st_mtime, "size": stat.st_size, "sha1": digest, "entries": entries}, f)
+        os.replace(cache_file + ".tmp", cache_file)
+    except OSError:
+        pass
+    return entries
+
+
+def load_bib_index():
+    global bib_index
+    bib_index = {}
+    for bib in bib_files:
+        try:
+            entries = load_bib(bib)
+        except OSError:
+            print("Could not open '%s'" % bib)
+            continue
+        for key, line in entries:
+            bib_index.setdefault(key, []).append((bib, line))
+
+
+def print_warnings(diags, enabled):
     warnings = 0
-    sorted_warn = sorted(warn, key=lambda tup: tup[0][0])
-    for cw in sorted_warn:
-        w = cw[0]
-        if w[0] != -1 and tex_lines[w[0]].strip().startswith("%"):
+    suppressed = 0
+    for d in diags:
+        if not enabled >> d.rule & 1:
+            suppressed += 1
             continue
 
-        if output: 
-            print("\033[33mWarning %d\033[0m: " % (warnings + 1), end = "")
+        print("\033[33mWarning %d\033[0m: " % (warnings + 1), end = "")
         warnings += 1
-        if w[0] != -1:
-            if output: print("Line %d: %s" % (w[0] + 1, w[1]), end = "")
+        if d.line != -1:
+            print("Line %d: %s" % (d.line + 1, d.message), end = "")
         else:
-            if output: print(w[1], end = "")
+            print(d.message, end = "")
         
-        if output:
-            print("  \033[90m[%s]\033[0m" % cw[1], end = "")
-            print("")
+        print("  \033[90m[%s]\033[0m" % all_checks[d.rule][2], end = "")
+        print("")
 
-        if len(w) > 2:
-            if output: print("    %s" % tex_lines[w[0]].replace("\t", " "))
-            if output: print("    %s\033[33m%s\033[0m" % (" " * w[2][0], "^" * (w[2][1] - w[2][0])))
-    return warnings
+        if d.start is not None:
+            print("    %s" % tex_lines[d.line].replace("\t", " "))
+            print("    %s\033[33m%s\033[0m" % (" " * d.start, "^" * (d.end - d.start)))
+        # show the warning right away, later rules may still be running
+        sys.stdout.flush()
+    return warnings, suppressed
 
 
 CATEGORY_GENERAL = 1
@@ -851,7 +1380,7 @@ CATEGORY_STYLE = 8
 CATEGORY_REFERENCE = 16
 
 checks = [
-    (check_space_before_cite,           CATEGORY_TYPOGRAPHY, "cite-space"),
+    (line_check("cite-space"),          CATEGORY_TYPOGRAPHY, "cite-space"),
     (check_figure_alignment,            CATEGORY_STYLE,      "figure-alignment"),
     (check_table_alignment,             CATEGORY_STYLE,      "table-alignment"),
     (check_listing_alignment,           CATEGORY_STYLE,      "listing-alignment"),
@@ -862,56 +1391,66 @@ checks = [
     (check_table_has_caption,           CATEGORY_STYLE,      "table-caption"),
     (check_listing_has_caption,         CATEGORY_STYLE,      "listing-caption"),
     (check_no_resizebox_for_tables,     CATEGORY_STYLE,      "resize-table"),
-    (check_weird_units,                 CATEGORY_STYLE,      "dimensions"),
+    (line_check("dimensions"),          CATEGORY_STYLE,      "dimensions"),
     (check_figure_caption_label_order,  CATEGORY_REFERENCE,  "figure-caption-order"),
     (check_table_caption_label_order,   CATEGORY_REFERENCE,  "table-caption-order"),
     (check_listing_caption_label_order, CATEGORY_REFERENCE,  "listing-caption-order"),
-    (check_todos,                       CATEGORY_GENERAL,    "todo"),
-    (check_notes,                       CATEGORY_GENERAL,    "note"),
-    (check_math_numbers,                CATEGORY_TYPOGRAPHY, "math-numbers"),
-    (check_large_numbers_without_si,    CATEGORY_TYPOGRAPHY, "si"),
+    (line_check("todo"),                CATEGORY_GENERAL,    "todo"),
+    (line_check("note"),                CATEGORY_GENERAL,    "note"),
+    (line_check("math-numbers"),        CATEGORY_TYPOGRAPHY, "math-numbers"),
+    (line_check("si"),                  CATEGORY_TYPOGRAPHY, "si"),
     (check_listing_in_correct_float,    CATEGORY_REFERENCE,  "listing-float"),
     (check_tabular_in_correct_float,    CATEGORY_REFERENCE,  "tabular-float"),
     (check_tikz_in_correct_float,       CATEGORY_REFERENCE,  "tikz-float"),
-    (check_comment_has_space,           CATEGORY_TYPOGRAPHY, "comment-space"),
-    (check_percent_without_siunix,      CATEGORY_TYPOGRAPHY, "percentage"),
-    (check_short_form,                  CATEGORY_GENERAL,    "short-form"),
+    (line_check("comment-space"),       CATEGORY_TYPOGRAPHY, "comment-space"),
+    (line_check("percentage"),          CATEGORY_TYPOGRAPHY, "percentage"),
+    (line_check("short-form"),          CATEGORY_GENERAL,    "short-form"),
     (check_labels_referenced,           CATEGORY_REFERENCE,  "label-referenced"),
     (check_section_capitalization,      CATEGORY_VISUAL,     "capitalization"),
     (check_quotation,                   CATEGORY_TYPOGRAPHY, "quotes"),
-    (check_hline_in_table,              CATEGORY_VISUAL,     "hline"),
-    (check_space_before_punctuation,    CATEGORY_TYPOGRAPHY, "punctuation-space"),
+    (line_check("hline"),               CATEGORY_VISUAL,     "hline"),
+    (line_check("punctuation-space"),   CATEGORY_TYPOGRAPHY, "punctuation-space"),
     (check_headers_without_text,        CATEGORY_VISUAL,     "two-header"),
     (check_one_sentence_paragraphs,     CATEGORY_VISUAL,     "single-sentence"),
     (check_multiple_sentences_per_line, CATEGORY_GENERAL,    "multiple-sentences"),
     (check_unbalanced_brackets,         CATEGORY_TYPOGRAPHY, "unbalanced-brackets"),
-    (check_and_or,                      CATEGORY_TYPOGRAPHY, "and-or"),
-    (check_ellipsis,                    CATEGORY_TYPOGRAPHY, "ellipsis"),
-    (check_etc,                         CATEGORY_STYLE,      "etc"),
+    (line_check("and-or"),              CATEGORY_TYPOGRAPHY, "and-or"),
+    (line_check("ellipsis"),            CATEGORY_TYPOGRAPHY, "ellipsis"),
+    (line_check("etc"),                 CATEGORY_STYLE,      "etc"),
     (check_punctuation_end_of_line,     CATEGORY_TYPOGRAPHY, "punctuation"),
-    (check_footnote,                    CATEGORY_TYPOGRAPHY, "footnote"),
-    (check_table_vertical_lines,        CATEGORY_VISUAL,     "vline"),
+    (line_check("footnote"),            CATEGORY_TYPOGRAPHY, "footnote"),
+    (line_check("vline"),               CATEGORY_VISUAL,     "vline"),
     (check_table_top_caption,           CATEGORY_STYLE,      "table-top-caption"),
-    (check_will,                        CATEGORY_GENERAL,    "will"),
+    (line_check("will"),                CATEGORY_GENERAL,    "will"),
     (check_subsection_count,            CATEGORY_VISUAL,     "single-subsection"),
     (check_mixed_compact_and_item,      CATEGORY_VISUAL,     "mixed-compact"),
     (check_center_in_float,             CATEGORY_VISUAL,     "float-center"),
-    (check_appendix,                    CATEGORY_STYLE,      "appendix"),
-    (check_eqnarray,                    CATEGORY_VISUAL,     "eqnarray"),
-    (check_acm_pc,                      CATEGORY_STYLE,      "inclusion"),
+    (line_check("appendix"),            CATEGORY_STYLE,      "appendix"),
+    (line_check("eqnarray"),            CATEGORY_VISUAL,     "eqnarray"),
+    (line_check("inclusion"),           CATEGORY_STYLE,      "inclusion"),
     (check_cite_noun,                   CATEGORY_STYLE,      "cite-noun"),
     (check_cite_duplicate,              CATEGORY_REFERENCE,  "cite-duplicate"),
     (check_conjunction_start,           CATEGORY_STYLE,      "conjunction-start"),
     (check_brackets_space,              CATEGORY_TYPOGRAPHY, "bracket-spacing"),
     (check_acronym_capitalization,      CATEGORY_TYPOGRAPHY, "acronym-capitalization"),
-    (check_numeral,                     CATEGORY_GENERAL,    "numeral"),
-    (check_multicite,                   CATEGORY_STYLE,      "multiple-cites"),
-    (check_emptycite,                   CATEGORY_REFERENCE,  "cite-empty"),
-    (check_colors,                      CATEGORY_VISUAL,     "colors"),
+    (line_check("numeral"),             CATEGORY_GENERAL,    "numeral"),
+    (line_check("multiple-cites"),      CATEGORY_STYLE,      "multiple-cites"),
+    (line_check("cite-empty"),          CATEGORY_REFERENCE,  "cite-empty"),
+    (line_check("colors"),              CATEGORY_VISUAL,     "colors"),
     (check_inconsistent_word_style,     CATEGORY_TYPOGRAPHY, "inconsistent-textstyle"),
-    (check_missing_word_style,          CATEGORY_TYPOGRAPHY, "missing-textstyle")
+    (check_missing_word_style,          CATEGORY_TYPOGRAPHY, "missing-textstyle"),
+    (check_cite_undefined,              CATEGORY_REFERENCE,  "cite-undefined"),
+    (check_suppression_switches,        CATEGORY_GENERAL,    "suppression-switch")
+]
+
+# rules for the whole project, checked once after all files
+project_checks = [
+    (check_bib_duplicate,               CATEGORY_REFERENCE,  "bib-duplicate"),
+    (check_bib_unused,                  CATEGORY_REFERENCE,  "bib-unused")
 ]
 
+all_checks = checks + project_checks
+
 category_switches = [
     ("all",        CATEGORY_GENERAL | CATEGORY_REFERENCE | CATEGORY_STYLE | CATEGORY_TYPOGRAPHY | CATEGORY_VISUAL),
     ("general",    CATEGORY_GENERAL),
@@ -922,110 +1461,352 @@ category_switches = [
 ]
 
 
+# rules that are not part of any category, they are only enabled by their own switch,
+# e.g., a shared bibliography usually contains many entries that are not cited by one paper
+opt_in_switches = ["bib-unused"]
+
+# bitmask of the rules (position in all_checks) for every rule and category switch
+switch_masks = {}
+for idx, c in enumerate(all_checks):
+    switch_masks[c[2]] = 1 << idx
+for name, cat in category_switches:
+    switch_masks[name] = sum(1 << idx for idx, c in enumerate(all_checks) if cat & c[1] and c[2] not in opt_in_switches)
+
+thresholds = {
+    "si-digits": 5,
+    "capitalization-length": 4
+}
+
+config_file = None
+config = {}
+
+
 def switch_exists(s):
-    switches = [x[0] for x in category_switches] + [x[2] for x in checks]
-    return s in switches
+    return s in switch_masks
 
 
-def add_categories(cat, new_cat):
-    if type(new_cat) is str:
-        full_cat = [x[0] for x in category_switches]
-        if new_cat in full_cat:
-            # full category, add everythingt that is not already there
-            idx = full_cat.index(new_cat)
-            new_cat = category_switches[idx][1]
+def apply_switches(enabled, switches):
+    # switches are (include, switch) pairs, evaluated in order
+    for include, s in switches:
+        if include:
+            enabled |= switch_masks[s]
         else:
-            cat.add(new_cat)
-    if type(new_cat) is int:
-        for cats in checks:
-            if new_cat & cats[1]:
-                cat.add(cats[2])
+            enabled &= ~switch_masks[s]
+    return enabled
+
+
+def config_switches(rules):
+    switches = []
+    for r in rules:
+        include = not r.startswith("-")
+        s = r.lstrip("-")
+        if not switch_exists(s):
+            print("Unknown switch '%s' in '%s'" % (s, config_file))
+            usage()
+        switches.append((include, s))
+    return switches
+
+
+def find_config(path):
+    path = os.path.abspath(path if os.path.isdir(path) else (os.path.dirname(path) or "."))
+    while True:
+        if os.path.isfile(os.path.join(path, ".paperlint.toml")):
+            return os.path.join(path, ".paperlint.toml")
+        if os.path.dirname(path) == path:
+            return None
+        path = os.path.dirname(path)
+
+
+def load_config(path):
+    global config_file, config, line_rules
+    config_file = find_config(path)
+    if config_file is None: return
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            print("Reading '%s' requires Python 3.11 or the tomli package" % config_file)
+            sys.exit(1)
+    try:
+        config = tomllib.load(open(config_file, "rb"))
+    except (OSError, tomllib.TOMLDecodeError) as e:
+        print("Could not read '%s': %s" % (config_file, e))
+        sys.exit(1)
+    for t in config.get("thresholds", {}):
+        if t not in thresholds:
+            print("Unknown threshold '%s' in '%s'" % (t, config_file))
+            usage()
+        thresholds[t] = int(config["thresholds"][t])
+    # patterns depend on the thresholds
+    line_rules = None
+
+
+def rule_masks(files, cli_switches):
+    # resolve the enabled rules once per combination of matching overrides
+    base = config_switches(config.get("rules", []))
+    overrides = [(o.get("paths", []), config_switches(o.get("rules", []))) for o in config.get("override", [])]
+    root = os.path.dirname(config_file) if config_file else "."
+    resolved = {}
+    masks = []
+    for f in files + [None]:
+        rel = os.path.relpath(f, root).replace(os.sep, "/") if f else None
+        matching = tuple(idx for idx, o in enumerate(overrides) if rel and any(fnmatch.fnmatch(rel, p) for p in o[0]))
+        if matching not in resolved:
+            switches = base + [s for idx in matching for s in overrides[idx][1]] + cli_switches
+            resolved[matching] = apply_switches(switch_masks["all"], switches)
+        masks.append(resolved[matching])
+    # the last mask is for the project-wide rules
+    return masks
+
+
+def run_check_group(task):
+    group, start, end = task
+    # the line-local rules are evaluated together, so they always end up in the same group
+    if any(checks[c][2] in line_warnings_switches for c in group):
+        run_line_checks(start, end)
+    return [list(checks[c][0](start, end) if checks[c][2] in line_range_switches else checks[c][0]()) for c in group]
+
+
+def run_checks(file_id, jobs):
+    chunked = [c for c in range(len(checks)) if checks[c][2] in line_warnings_switches or checks[c][2] in line_range_switches]
+    rest = [c for c in range(len(checks)) if c not in chunked]
+    groups = [rest[g::jobs] for g in range(jobs)]
+    # shard the line-local rules over chunks of lines, the other rules are split into groups
+    chunks = iter([(chunked, s, min(s + line_chunk_size, len(tex_lines))) for s in range(0, len(tex_lines), line_chunk_size)])
+    # workers are forked after preprocessing and share the document copy-on-write
+    import multiprocessing
+    import collections
+    with multiprocessing.get_context("fork").Pool(jobs) as pool:
+        rest_results = pool.map_async(run_check_group, [(g, 0, None) for g in groups])
+        # only a few chunks are checked ahead, so the results held at once are bounded by the chunk size
+        pending = collections.deque((t, pool.apply_async(run_check_group, (t, ))) for t in itertools.islice(chunks, jobs))
+        rest_warnings = [collections.deque(diagnostics(file_id, c, res)) for g, group_result in zip(groups, rest_results.get()) for c, res in zip(g, group_result)]
+
+        while pending:
+            (group, start, end), result = pending.popleft()
+            for t in itertools.islice(chunks, 1):
+                pending.append((t, pool.apply_async(run_check_group, (t, ))))
+            streams = [diagnostics(file_id, c, res) for c, res in zip(group, result.get())]
+            # the warnings of the other rules are merged in as soon as their lines are reached
+            for warn in rest_warnings:
+                taken = []
+                while warn and warn[0].line < end:
+                    taken.append(warn.popleft())
+                streams.append(taken)
+            yield from heapq.merge(*streams)
+        yield from heapq.merge(*rest_warnings)
+
+
+def diagnostics(file_id, rule, warn):
+    for w in warn:
+        if not is_suppressed(rule, w[0]):
+            yield Diagnostic.from_warning(file_id, rule, w)
+
+
+def unique(diags):
+    # duplicates are reported on the same line, so only that line has to be remembered
+    line = None
+    seen = set()
+    for d in diags:
+        if d.line != line:
+            line = d.line
+            seen.clear()
+        if d not in seen:
+            seen.add(d)
+            yield d
+
+
+def parallel_start_methods():
+    # multiprocessing is only imported if it is actually used, it is slow to import
+    import multiprocessing
+    return multiprocessing.get_all_start_methods()
+
+
+def stream_checks(file_id, jobs = 1):
+    if jobs > 1 and "fork" in parallel_start_methods():
+        # the chunks are already merged in line order
+        return unique(run_checks(file_id, jobs))
+    streams = [stream_line_checks(file_id)]
+    for c in range(len(checks)):
+        if checks[c][2] not in line_warnings_switches:
+            streams.append(diagnostics(file_id, c, checks[c][0]()))
+    # every rule reports its warnings in line order, merge them as they come in
+    return unique(heapq.merge(*streams))
+
+
+def document_metrics():
+    metrics = {}
+    metrics["lines"] = len(tex_lines)
+    metrics["sentences"] = sum(len(line_sentences(i)) + (tex_lines_clean[i].rstrip()[-1:] in [".", "!", "?"]) for i in range(len(tex_lines)) if not in_code(i))
+    metrics["floats"] = sum(len(envs[f]) for f in ["figure", "table", "listing"] if f in envs)
+    metrics["citations"] = sum(1 for l in tex_lines_clean for c in cited_keys(l))
+    metrics["acronyms"] = len(find_acronyms()[0])
+    return metrics
+
+
+def file_stats(task):
+    # map step: warnings per rule and metrics for one file, run in a worker process
+    file_id, file, enabled = task
+    if not next_file(file):
+        return None
+    preprocess()
+    rules = {}
+    suppressed = 0
+    for d in stream_checks(file_id):
+        if not enabled >> d.rule & 1:
+            suppressed += 1
+            continue
+        rules[checks[d.rule][2]] = rules.get(checks[d.rule][2], 0) + 1
+    cited = set(key for l in tex_lines_clean for key, span in cited_keys(l))
+    return rules, suppressed, document_metrics(), cited
+
+
+def print_stats(masks, jobs):
+    tasks = [(file_id, file, masks[file_id]) for file_id, file in enumerate(tex_files)]
+    if jobs > 1 and len(tasks) > 1 and "fork" in parallel_start_methods():
+        import multiprocessing
+        with multiprocessing.get_context("fork").Pool(jobs) as pool:
+            results = pool.map(file_stats, tasks)
+    else:
+        results = map(file_stats, tasks)
+
+    # reduce step: sum up the results of all files
+    rules = {}
+    suppressed = 0
+    metrics = {}
+    errors = 0
+    for result in results:
+        if result is None:
+            errors += 1
+            continue
+        file_rules, file_suppressed, file_metrics, cited = result
+        for r in file_rules:
+            rules[r] = rules.get(r, 0) + file_rules[r]
+        suppressed += file_suppressed
+        for m in file_metrics:
+            metrics[m] = metrics.get(m, 0) + file_metrics[m]
+        bib_cited.update(cited)
+    if bib_index:
+        for idx, c in enumerate(project_checks):
+            for w in c[0]():
+                if masks[-1] >> (len(checks) + idx) & 1:
+                    rules[c[2]] = rules.get(c[2], 0) + 1
+                else:
+                    suppressed += 1
 
-        
-def remove_categories(cat, rem_cat):
-    if type(rem_cat) is str:
-        full_cat = [x[0] for x in category_switches]
-        if rem_cat in full_cat:
-            # full category, add everythingt that is not already there
-            idx = full_cat.index(rem_cat)
-            rem_cat = category_switches[idx][1]
-        else:
-            if rem_cat in cat:
-                cat.remove(rem_cat)
-    if type(rem_cat) is int:
-        for cats in checks:
-            if (rem_cat & cats[1]) and cats[2] in cat:
-                cat.remove(cats[2])
+    categories = {}
+    for name, cat in category_switches[1:]:
+        categories[name] = sum(rules[c[2]] for c in all_checks if c[1] & cat and c[2] in rules)
+
+    import json
+    print(json.dumps({
+        "files": len(tex_files),
+        "errors": errors,
+        "warnings": sum(rules.values()),
+        "suppressed": suppressed,
+        "rules": rules,
+        "categories": categories,
+        "metrics": metrics
+    }, sort_keys = True, separators = (",", ":")))
+    return errors
 
 
 def main():
+    if len(sys.argv) < 2:
+        usage()
+    find_files(sys.argv[1])
 
     nr_warnings = 0
     nr_suppressed = 0
+    nr_fixed = 0
+    nr_errors = 0
 
     idx = 1
-    has_rules = False
     exit_code = False
+    fix = False
+    stats = False
+    jobs = None
     
     # -x to exclude, -i to include
-    used_categories = set()
-    add_categories(used_categories, "all")
+    cli_switches = []
         
     while idx < len(sys.argv):
         arg = sys.argv[idx]
-        if arg == "-x":
-            if idx < len(sys.argv):
+        if arg == "-x" or arg == "-i":
+            if idx + 1 < len(sys.argv):
                 if switch_exists(sys.argv[idx + 1]):
-                    remove_categories(used_categories, sys.argv[idx + 1])
+                    cli_switches.append((arg == "-i", sys.argv[idx + 1]))
                     idx += 1
-                    has_rules = True
                 else:
                     print("Unknown switch '%s'" % sys.argv[idx + 1])
                     usage()
             else:
-                print("Missing switch after -x")
+                print("Missing switch after %s" % arg)
                 usage()
 
-        if arg == "-i":
-            if idx < len(sys.argv):
-                if switch_exists(sys.argv[idx + 1]):
-                    add_categories(used_categories, sys.argv[idx + 1])
-                    idx += 1
-                    has_rules = True
-                else:
-                    print("Unknown switch '%s'" % sys.argv[idx + 1])
-                    usage()
+        if arg == "-j":
+            if idx + 1 < len(sys.argv) and sys.argv[idx + 1].isdigit():
+                jobs = int(sys.argv[idx + 1])
+                idx += 1
             else:
-                print("Missing switch after -i")
+                print("Missing number of jobs after -j")
                 usage()
-        
+
+        if arg == "--fix":
+            fix = True
+
+        if arg == "--stats":
+            stats = True
+
         if arg == "--error":
             exit_code = True
         idx += 1
 
-    if not has_rules:
-        add_categories(used_categories, "all")
+    load_config(sys.argv[1])
+    masks = rule_masks(tex_files, cli_switches)
+    load_bib_index()
+
+    if stats:
+        if print_stats(masks, jobs or os.cpu_count() or 1):
+            sys.exit(1)
+        return
+    jobs = jobs or 1
 
-    for file in tex_files:
-        next_file(file)
+    for file_id, file in enumerate(tex_files):
+        if not next_file(file):
+            nr_errors += 1
+            continue
         print("Inspecting file \033[94m'%s'\033[0m" % file)
         
         preprocess()
 
-        warnings = []
-        suppressed = []
-        for c in checks:
-            add_warn = c[0]()
-            if c[2] in used_categories:
-                warnings += [(x, c[2]) for x in add_warn]
-            else:
-                suppressed += [(x, c[2]) for x in add_warn]
+        if fix:
+            fixed = fix_file(file, file_id, jobs, masks[file_id])
+            if fixed:
+                print("Fixed %d warnings" % fixed)
+            nr_fixed += fixed
+
+        warnings, suppressed = print_warnings(stream_checks(file_id, jobs), masks[file_id])
+        nr_warnings += warnings
+        nr_suppressed += suppressed
 
-        nr_warnings += print_warnings(warnings)
-        nr_suppressed += print_warnings(suppressed, output = False)
+        for l in tex_lines_clean:
+            bib_cited.update(key for key, span in cited_keys(l))
+
+    if bib_index:
+        print("Inspecting bibliography files \033[94m%s\033[0m" % ", ".join("'%s'" % f for f in bib_files))
+        project_warnings = (Diagnostic.from_warning(-1, len(checks) + idx, w) for idx, c in enumerate(project_checks) for w in c[0]())
+        warnings, suppressed = print_warnings(project_warnings, masks[-1])
+        nr_warnings += warnings
+        nr_suppressed += suppressed
 
     print("")
-    print("%d warnings printed; %d suppressed warnings" % (nr_warnings, nr_suppressed))
+    print("%d warnings printed; %d suppressed warnings%s%s" % (nr_warnings, nr_suppressed, ("; %d warnings fixed" % nr_fixed) if fix else "", ("; %d files could not be read" % nr_errors) if nr_errors else ""))
+    # files that could not be read fail the run, but only after all other files were checked
+    if nr_errors:
+        sys.exit(1)
     if exit_code:
         sys.exit(1 if nr_warnings > 0 else 0)
 
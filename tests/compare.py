@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Compares the rules of paperlint.py with the frozen reference implementation in
+# reference_paperlint.py, and the serial with the parallel engine, per rule. Each file
+# is also checked as a generated long document that repeats it over several chunks.
+#
+#     python3 tests/compare.py [<file.tex/path> ...] [--update]
+#
+# Without a path, the checked-in corpus in tests/corpus is used. Its expected
+# diagnostics are stored next to each file as <file>.expected, --update rewrites them.
+# A <file>.fixed contains the document after --fix, it is written by hand.
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import paperlint
+import reference_paperlint
+
+corpus = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+# small chunks, so that the parallel engine splits even the short documents of the corpus
+paperlint.line_chunk_size = 16
+
+# rules whose results were changed on purpose since the reference, they are compared to the expected
+# diagnostics, and test_changed_rules.py asserts the intended difference for each of them
+changed_rules = {
+    "multiple-sentences": "uses the sentence model, which knows abbreviations",
+    "single-sentence": "uses the sentence model, which knows abbreviations",
+    "conjunction-start": "uses the sentence model, which knows abbreviations",
+    "punctuation": "skips all code environments, not only lstlisting",
+    "acronym-capitalization": "maps columns of the uppercase line back to the line",
+    "cite-noun": "maps columns of the lowercase line back to the line",
+    "quotes": "skips code environments and \\verb",
+    "bracket-spacing": "skips code environments and \\verb",
+    "cite-undefined": "not in the reference",
+    "suppression-switch": "not in the reference"
+}
+
+
+def reference(content):
+    warnings = reference_paperlint.lint(content)
+    # the reference knows no suppression comments, they are applied as in paperlint
+    paperlint.set_text(content)
+    paperlint.preprocess()
+    rules = dict((c[2], i) for i, c in enumerate(paperlint.checks))
+    return set((switch, w[0], w[1], tuple(w[2]) if len(w) > 2 else None) for switch in warnings for w in warnings[switch]
+               if not (switch in rules and paperlint.is_suppressed(rules[switch], w[0])))
+
+
+def bib_index(file):
+    # the entries of the bibliography files next to the file, as paperlint finds them for a single file
+    index = {}
+    path = os.path.dirname(file)
+    for f in sorted(os.listdir(path)):
+        if f.endswith(".bib"):
+            for key, line in paperlint.parse_bib(open(os.path.join(path, f), encoding = "utf-8").read()):
+                index.setdefault(key, []).append((f, line))
+    return index
+
+
+def current(content, jobs = 1, bib = None):
+    paperlint.bib_index = bib
+    paperlint.set_text(content)
+    paperlint.preprocess()
+    return set((paperlint.checks[d.rule][2], d.line, d.message, (d.start, d.end) if d.start is not None else None) for d in paperlint.stream_checks(0, jobs))
+
+
+def fixed(content):
+    # the document after applying the fixes of all rules, as --fix does
+    paperlint.bib_index = None
+    paperlint.set_text(content)
+    paperlint.preprocess()
+    lines, count = paperlint.apply_fixes(list(paperlint.stream_checks(0, 1)), (1 << len(paperlint.checks)) - 1)
+    return "\n".join(lines)
+
+
+def format_diagnostics(diags):
+    return "".join("%d: [%s] %s %s\n" % (d[1] + 1, d[0], d[2], d[3]) for d in sorted(diags, key = lambda d: (d[1], d[0], d[2], d[3] or (-1, -1))))
+
+
+def differences(expected, found, rules = None):
+    # {rule: (only expected, only found)}
+    diff = {}
+    for d in expected ^ found:
+        if rules is not None and d[0] not in rules: continue
+        diff.setdefault(d[0], (set(), set()))[0 if d in expected else 1].add(d)
+    return diff
+
+
+def repeated(content):
+    # the document repeated at least twice and over at least four chunks of the parallel engine
+    lines = content.count("\n") + 1
+    return "\n".join([content] * max(2, -(-4 * paperlint.line_chunk_size // lines)))
+
+
+def find_tex_files(paths):
+    files = []
+    for path in paths:
+        if path.endswith(".tex"):
+            files.append(path)
+        else:
+            for p, subdirs, names in os.walk(path):
+                files += [os.path.join(p, f) for f in sorted(names) if f.endswith(".tex")]
+    return files
+
+
+def main():
+    update = "--update" in sys.argv
+    paths = [a for a in sys.argv[1:] if a != "--update"] or [corpus]
+    compared = [c[2] for c in paperlint.checks if c[2] not in changed_rules]
+
+    durations = {"reference": 0.0, "serial": 0.0, "parallel": 0.0}
+    lines = 0
+    failed = 0
+    documents = []
+    for file in find_tex_files(paths):
+        content = open(file, encoding = "utf-8").read()
+        documents.append((file, file, content, file + ".expected"))
+        documents.append(("%s (repeated)" % file, file, repeated(content), None))
+
+    for name, file, content, expected_file in documents:
+        lines += content.count("\n") + 1
+        results = {}
+        for engine in durations:
+            start = time.perf_counter()
+            if engine == "reference":
+                results[engine] = reference(content)
+            else:
+                results[engine] = current(content, 1 if engine == "serial" else 2, bib_index(file))
+            durations[engine] += time.perf_counter() - start
+
+        comparisons = [("reference", "serial", compared), ("serial", "parallel", None)]
+        if expected_file and update:
+            open(expected_file, "w", encoding = "utf-8").write(format_diagnostics(results["serial"]))
+        elif expected_file and os.path.exists(expected_file):
+            expected = open(expected_file, encoding = "utf-8").read()
+            if expected != format_diagnostics(results["serial"]):
+                failed += 1
+                print("\033[33mDifference\033[0m in '%s': diagnostics do not match '%s'" % (name, expected_file))
+        for a, b, rules in comparisons:
+            for rule, (only_a, only_b) in sorted(differences(results[a], results[b], rules).items()):
+                failed += 1
+                print("\033[33mDifference\033[0m in '%s' for rule %s: %d warnings only in %s, %d only in %s" % (name, rule, len(only_a), a, len(only_b), b))
+                for d in sorted(only_a | only_b, key = lambda d: d[1])[:5]:
+                    print("    %s line %d: %s %s" % (a if d in only_a else b, d[1] + 1, d[2], d[3]))
+
+    print("")
+    print("%d documents with %d lines checked, rules changed on purpose: %s" % (len(documents), lines, ", ".join(sorted(changed_rules))))
+    for engine in durations:
+        print("%-10s %8.3fs %12d lines/s" % (engine, durations[engine], lines / durations[engine] if durations[engine] else 0))
+    print("%d differences found" % failed)
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# Checks the startup cost of paperlint.py against a budget, using python -X importtime.
+#
+#     python3 tests/startup.py [<budget in ms>]
+#
+# The import is measured with cached bytecode (the best of several runs), so the
+# result does not depend on compiling the script. Modules that are only needed by
+# some features must not be imported when the module is loaded.
+import os
+import re
+import subprocess
+import sys
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# about 10 ms here, most of it for importing re
+import_budget_ms = 25
+runs = 5
+deferred_modules = ["multiprocessing", "tomllib", "hashlib", "json", "shutil"]
+
+
+def import_times():
+    # {module: cumulative import time in ms} for a single import of paperlint
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import paperlint"], cwd = root, env = env,
+                            stderr = subprocess.PIPE, universal_newlines = True, check = True).stderr
+    times = {}
+    for line in output.splitlines():
+        m = re.match("import time:\\s*(\\d+)\\s*\\|\\s*(\\d+)\\s*\\|\\s*(\\S+)", line)
+        if m:
+            times[m.group(3)] = int(m.group(2)) / 1000.0
+    return times
+
+
+def measure():
+    # (best import time of paperlint in ms, deferred modules that were imported)
+    import_times()  # writes the bytecode cache
+    best = None
+    imported = set()
+    for i in range(runs):
+        times = import_times()
+        best = times["paperlint"] if best is None else min(best, times["paperlint"])
+        imported |= set(m for m in deferred_modules if m in times)
+    return best, sorted(imported)
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else import_budget_ms
+    best, imported = measure()
+    failed = 0
+    print("import paperlint: %.1f ms (budget %.1f ms)" % (best, budget))
+    if best > budget:
+        failed += 1
+        print("\033[33mOver budget\033[0m: importing paperlint takes %.1f ms" % best)
+    for m in imported:
+        failed += 1
+        print("\033[33mImported at startup\033[0m: %s" % m)
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
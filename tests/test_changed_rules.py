@@ -0,0 +1,40 @@
+import compare
+
+# for each rule that was changed on purpose: a document and the warnings (line, span) that
+# only the reference reports and that only the current implementation reports
+cases = {
+    "multiple-sentences": ("This works well, e.g. Linux is fast.\n",
+                           [(0, (20, 27))], []),
+    "single-sentence": ("Intro line.\n\nWe compare it to e.g. the baseline here.\n\nMore.\n",
+                        [], [(2, (0, 40))]),
+    "conjunction-start": ("The work of Smith et al. And Jones shows this.\n",
+                          [(0, (23, 29))], []),
+    "punctuation": ("\\begin{verbatim}\nthis is a long line of code without any punctuation at the end\n\\end{verbatim}\n",
+                    [(1, (60, 62))], []),
+    # "ß" becomes "SS" in the uppercase line, the span must still point at "Gpu"
+    "acronym-capitalization": ("The GPU is fast.\nDie Straße nutzt die Gpu sehr oft.\n",
+                               [(1, (22, 25))], [(1, (21, 24))]),
+    # "İ" becomes two characters in the lowercase line, the span must still point at "in \cite"
+    "cite-noun": ("İstanbul studies in \\cite{x} show this.\n",
+                  [(0, (18, 26))], [(0, (17, 25))]),
+    "quotes": ("\\begin{verbatim}\nprint(\"q\")\n\\end{verbatim}\n",
+               [(1, (5, 8))], []),
+    "bracket-spacing": ("We write \\verb|f( x)| inline.\n",
+                        [(0, (15, 18)), (0, (16, 18))], []),
+    "cite-undefined": ("As shown before \\cite{missing}.\n",
+                       [], [(0, (22, 29))]),
+    "suppression-switch": ("% paperlint-disable-next-line wil\nThis is it.\n",
+                           [], [(-1, None)])
+}
+
+
+def test_all_changed_rules_have_a_case():
+    assert sorted(cases) == sorted(compare.changed_rules)
+
+
+def test_changed_rules():
+    for rule, (document, only_reference, only_current) in cases.items():
+        diff = compare.differences(compare.reference(document), compare.current(document, 1, {"known": [("refs.bib", 0)]}), [rule])
+        found = diff.get(rule, (set(), set()))
+        assert sorted((d[1], d[3]) for d in found[0]) == only_reference, rule
+        assert sorted((d[1], d[3]) for d in found[1]) == only_current, rule
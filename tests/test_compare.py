@@ -0,0 +1,51 @@
+import os
+
+import compare
+
+
+def corpus_files():
+    return compare.find_tex_files([compare.corpus])
+
+
+def test_corpus_exists():
+    assert len(corpus_files()) > 0
+
+
+def test_expected_diagnostics():
+    for file in corpus_files():
+        content = open(file, encoding = "utf-8").read()
+        expected = open(file + ".expected", encoding = "utf-8").read()
+        assert compare.format_diagnostics(compare.current(content, 1, compare.bib_index(file))) == expected, file
+
+
+def test_reference():
+    rules = [c[2] for c in compare.paperlint.checks if c[2] not in compare.changed_rules]
+    for file in corpus_files():
+        content = open(file, encoding = "utf-8").read()
+        assert compare.differences(compare.reference(content), compare.current(content), rules) == {}, file
+
+
+def test_parallel():
+    for file in corpus_files():
+        content = open(file, encoding = "utf-8").read()
+        bib = compare.bib_index(file)
+        assert compare.differences(compare.current(content, 1, bib), compare.current(content, 2, bib)) == {}, file
+
+
+def test_repeated():
+    # long documents with several copies of a file in several chunks, for the parallel engine
+    rules = [c[2] for c in compare.paperlint.checks if c[2] not in compare.changed_rules]
+    for file in corpus_files():
+        content = compare.repeated(open(file, encoding = "utf-8").read())
+        bib = compare.bib_index(file)
+        serial = compare.current(content, 1, bib)
+        assert compare.differences(compare.reference(content), serial, rules) == {}, file
+        assert compare.differences(serial, compare.current(content, 2, bib)) == {}, file
+
+
+def test_fix():
+    files = [f for f in corpus_files() if os.path.exists(f + ".fixed")]
+    assert len(files) > 0
+    for file in files:
+        content = open(file, encoding = "utf-8").read()
+        assert compare.fixed(content) == open(file + ".fixed", encoding = "utf-8").read(), file
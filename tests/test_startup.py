@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+import startup
+
+
+def test_deferred_imports():
+    best, imported = startup.measure()
+    assert imported == []
+
+
+# wall-clock times depend on the machine, the budget is only checked on request
+@pytest.mark.skipif("PAPERLINT_IMPORT_BUDGET_MS" not in os.environ, reason = "set PAPERLINT_IMPORT_BUDGET_MS to check the import time")
+def test_import_budget():
+    best, imported = startup.measure()
+    budget = float(os.environ["PAPERLINT_IMPORT_BUDGET_MS"])
+    assert best <= budget, "importing paperlint takes %.1f ms" % best